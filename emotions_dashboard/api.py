@@ -0,0 +1,394 @@
+import argparse
+import hmac
+import json
+import os
+import queue
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import charts
+import metrics
+from database import (
+    DEFAULT_USER, ENTRY_COLUMNS, format_timestamp, get_daily_rollup, get_generation, get_sentiment_series,
+    initialize_db, iter_entry_rows, save_entries,
+)
+from sentiment import analyze_sentiments, get_cache_stats
+from writer import BackgroundWriter
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Most entries accepted by one batch request, and returned by one range query
+MAX_BATCH_ENTRIES = 10000
+MAX_QUERY_ENTRIES = 10000
+
+# Range used when a query leaves out start or end (four-digit years, so the
+# bounds compare correctly with stored timestamps)
+OPEN_START = date(1000, 1, 1)
+OPEN_END = date(9999, 12, 31)
+
+# Bearer tokens and the journal each may use, as "token:user_id" pairs
+# separated by commas
+TOKENS_ENV = "EMOTIONS_API_TOKENS"
+
+# Endpoints answered without a token, e.g. for load balancer health checks
+PUBLIC_PATHS = {"/health"}
+
+# Interfaces that only accept connections from this machine
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+class ApiError(Exception):
+    """An error reported to the client with an HTTP status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _parse_date(value, name):
+    """Parse a YYYY-MM-DD query parameter."""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"'{name}' must be a date in YYYY-MM-DD format")
+
+def _date_range(params):
+    """Read the start and end dates of a range query; both default to an open bound."""
+    start = _parse_date(params["start"], "start") if "start" in params else OPEN_START
+    end = _parse_date(params["end"], "end") if "end" in params else OPEN_END
+    if start > end:
+        raise ApiError(400, "'start' must not be after 'end'")
+    return start, end
+
+def _user_id(params, body=None, token_user=None):
+    """
+    Validate the journal named by the request body or, failing that, the query.
+    A request made with a token defaults to the token's journal and may not
+    name another.
+    """
+    default = token_user if token_user is not None else DEFAULT_USER
+    if isinstance(body, dict) and "user_id" in body:
+        user_id = body["user_id"]
+    else:
+        user_id = params.get("user_id", default)
+    if not isinstance(user_id, str) or not user_id.strip():
+        raise ApiError(400, "'user_id' must be a non-empty string")
+    if token_user is not None and user_id != token_user:
+        raise ApiError(403, f"This token cannot access journal '{user_id}'")
+    return user_id
+
+def parse_tokens(value):
+    """
+    Parse bearer tokens in the EMOTIONS_API_TOKENS format.
+
+    Args:
+        value (str): Comma-separated "token:user_id" pairs
+
+    Returns:
+        dict: The journal of each token
+    """
+    tokens = {}
+    for pair in (value or "").split(","):
+        if not pair.strip():
+            continue
+        token, separator, user_id = pair.strip().partition(":")
+        if not separator or not token or not user_id:
+            raise ValueError(f"Expected 'token:user_id', got '{pair.strip()}'")
+        tokens[token] = user_id
+    return tokens
+
+def _entry_fields(entry):
+    """Validate one posted entry and return its (text, timestamp)."""
+    if not isinstance(entry, dict):
+        raise ApiError(400, "Each entry must be a JSON object")
+    text = entry.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ApiError(400, "'text' must be a non-empty string")
+    try:
+        timestamp = format_timestamp(entry.get("date"))
+    except (TypeError, ValueError, OverflowError, OSError):
+        # Out-of-range epoch seconds raise OverflowError or OSError
+        raise ApiError(400, "'date' must be an ISO 8601 timestamp or Unix epoch seconds")
+    return text, timestamp
+
+class EntryRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API over the emotions database.
+
+    POST /entries          {"text", "date"?, "user_id"?} -> the scored entry, once committed
+    POST /entries/batch    {"entries": [{"text", "date"?}, ...], "user_id"?} -> scores, in order
+    GET  /entries          ?start&end&user_id&limit -> entries, newest first
+    GET  /aggregate        ?start&end&user_id -> sentiment totals and per-day averages
+    GET  /health
+    GET  /charts/distribution, /charts/timeline   ?start&end&user_id -> Plotly figure JSON
+    GET  /metrics          -> timings and counters in Prometheus text format
+
+    When the server has tokens, every endpoint but /health needs an
+    "Authorization: Bearer <token>" header, and a request can only read and
+    write the journal its token is bound to.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "EmotionsAPI/1.0"
+    # Headers and body go out as separate writes; without TCP_NODELAY every
+    # keep-alive response waits out the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch({
+            "/entries": self._get_entries,
+            "/aggregate": self._get_aggregate,
+            "/health": lambda params: (200, {"status": "ok", "writer": self.server.writer.stats()}),
+            "/charts/distribution": lambda params: self._get_chart("distribution", params),
+            "/charts/timeline": lambda params: self._get_chart("timeline", params),
+            "/metrics": self._get_metrics,
+        })
+
+    def do_POST(self):
+        self._dispatch({
+            "/entries": self._post_entry,
+            "/entries/batch": self._post_batch,
+        })
+
+    def _dispatch(self, routes):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+        route = routes.get(path)
+        # Handlers are reused across keep-alive requests, so reset per request
+        self._token_user = None
+        try:
+            if path not in PUBLIC_PATHS:
+                self._token_user = self._authenticate()
+            if route is None:
+                raise ApiError(404, f"No such endpoint: {self.command} {url.path}")
+            status, payload = route(params)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            print(f"Error handling {self.command} {url.path}: {e}")
+            status, payload = 500, {"error": "Internal server error"}
+        self._send_json(status, payload)
+
+    def _authenticate(self):
+        """The journal the request's bearer token is bound to, or None when the server has no tokens."""
+        if not self.server.tokens:
+            return None
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() == "bearer" and token.strip():
+            token = token.strip().encode("utf-8")
+            # Compare against every token in constant time, so response times
+            # do not reveal how much of a guess was right
+            for candidate, user_id in self.server.tokens.items():
+                if hmac.compare_digest(candidate.encode("utf-8"), token):
+                    return user_id
+        raise ApiError(401, "A valid bearer token is required")
+
+    def _send_json(self, status, payload):
+        # Routes answering in plain text (e.g. /metrics) return a str payload,
+        # and routes with JSON serialized ahead of time (e.g. charts) bytes
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        elif isinstance(payload, bytes):
+            body, content_type = payload, "application/json"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 401:
+            self.send_header("WWW-Authenticate", 'Bearer realm="emotions"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            raise ApiError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            raise ApiError(400, "Request body must be valid JSON")
+
+    def _post_entry(self, params):
+        body = self._read_json()
+        text, timestamp = _entry_fields(body)
+        user_id = _user_id(params, body, self._token_user)
+        # Concurrent requests share the writer's transactions
+        try:
+            future = self.server.writer.submit(text, timestamp, timeout=self.server.submit_timeout, user_id=user_id)
+        except queue.Full:
+            raise ApiError(503, "Too many pending entries, retry later")
+        try:
+            sentiment, score = future.result(timeout=self.server.result_timeout)
+        except FutureTimeoutError:
+            raise ApiError(503, "Timed out waiting for the entry to be saved")
+        return 201, {"date": timestamp, "user_id": user_id, "sentiment": sentiment, "sentiment_score": score}
+
+    def _post_batch(self, params):
+        body = self._read_json()
+        entries = body.get("entries") if isinstance(body, dict) else None
+        if not isinstance(entries, list) or not entries:
+            raise ApiError(400, "'entries' must be a non-empty list")
+        if len(entries) > MAX_BATCH_ENTRIES:
+            raise ApiError(413, f"At most {MAX_BATCH_ENTRIES} entries per batch")
+        fields = [_entry_fields(entry) for entry in entries]
+        user_id = _user_id(params, body, self._token_user)
+
+        results = analyze_sentiments([text for text, _ in fields], workers=1)
+        rows = [
+            (text, sentiment, score, timestamp)
+            for (text, timestamp), (sentiment, score) in zip(fields, results)
+        ]
+        inserted = save_entries(rows, batch_size=len(rows), user_id=user_id)
+        if inserted != len(rows):
+            raise ApiError(500, "Could not save the batch")
+        return 201, {
+            "inserted": inserted,
+            "user_id": user_id,
+            "results": [{"sentiment": sentiment, "sentiment_score": score} for sentiment, score in results],
+        }
+
+    def _get_entries(self, params):
+        start, end = _date_range(params)
+        try:
+            limit = max(0, min(int(params.get("limit", 100)), MAX_QUERY_ENTRIES))
+        except ValueError:
+            raise ApiError(400, "'limit' must be an integer")
+        user_id = _user_id(params, token_user=self._token_user)
+
+        entries = []
+        rows = iter_entry_rows(start, end, chunk_size=min(limit, 1000) or 1, user_id=user_id)
+        for row in rows:
+            if len(entries) >= limit:
+                break
+            entries.append(dict(zip(ENTRY_COLUMNS, row)))
+        # Release the pooled connection without reading the rest of the range
+        rows.close()
+        return 200, {"user_id": user_id, "entries": entries}
+
+    def _get_aggregate(self, params):
+        start, end = _date_range(params)
+        user_id = _user_id(params, token_user=self._token_user)
+        rollup = get_daily_rollup(start, end, user_id)
+        if rollup is None:
+            raise ApiError(500, "Could not read the daily rollup")
+
+        count = int(rollup["score_count"].sum())
+        return 200, {
+            "user_id": user_id,
+            "entries": count,
+            "positive": int(rollup["positive_count"].sum()),
+            "negative": int(rollup["negative_count"].sum()),
+            "neutral": int(rollup["neutral_count"].sum()),
+            "mean_sentiment_score": float(rollup["score_sum"].sum()) / count if count else None,
+            "days": [
+                {"day": day, "entries": int(entries), "sentiment_score": float(score)}
+                for day, entries, score in zip(rollup["day"], rollup["score_count"], rollup["sentiment_score"])
+            ],
+        }
+
+    def _get_chart(self, name, params):
+        start, end = _date_range(params)
+        user_id = _user_id(params, token_user=self._token_user)
+
+        def build():
+            if name == "distribution":
+                rollup = get_daily_rollup(start, end, user_id)
+                return charts.distribution_from_rollup(rollup) if rollup is not None else None
+            series = get_sentiment_series(start, end, user_id=user_id)
+            return charts.timeline_from_series(*series) if series is not None else None
+
+        # Serialized once per journal, range and data generation
+        key = (name, user_id, str(start), str(end), get_generation(user_id))
+        figure = charts.cached_figure_json(key, build)
+        if figure is None:
+            raise ApiError(500, f"Could not build the {name} chart")
+        return 200, figure.encode("utf-8")
+
+    def _get_metrics(self, params):
+        gauges = {f"writer.{name}": value for name, value in self.server.writer.stats().items()}
+        gauges.update({f"sentiment.cache.{name}": value for name, value in get_cache_stats().items()})
+        gauges.update({f"charts.cache.{name}": value for name, value in charts.cache_stats().items()})
+        return 200, metrics.to_prometheus(gauges)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(host="127.0.0.1", port=8000, writer=None, submit_timeout=5.0, result_timeout=30.0, verbose=False,
+                tokens=None):
+    """
+    Create the API server, one thread per connection.
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port to listen on; 0 picks a free port
+        writer (BackgroundWriter): Writer for single-entry posts. Defaults to a new one
+        submit_timeout (float): Seconds a post waits for room in the writer's queue
+            before the server answers 503
+        result_timeout (float): Seconds a post waits for its entry to be committed
+            before the server answers 503. The entry stays queued and may
+            still be saved
+        verbose (bool): Log every request to stderr
+        tokens (dict): Bearer tokens and the journal each may use. Without
+            tokens, any client that can connect reads and writes every journal,
+            so the server must stay on localhost or a trusted network
+
+    Returns:
+        ThreadingHTTPServer: The server, not yet serving
+    """
+    server = ThreadingHTTPServer((host, port), EntryRequestHandler)
+    server.daemon_threads = True
+    server.writer = writer or BackgroundWriter()
+    server.submit_timeout = submit_timeout
+    server.result_timeout = result_timeout
+    server.verbose = verbose
+    server.tokens = dict(tokens or {})
+    return server
+
+def serve_in_thread(server):
+    """
+    Run a server on a background thread, e.g. for tests and the load test.
+
+    Returns:
+        threading.Thread: The serving thread
+    """
+    thread = threading.Thread(target=server.serve_forever, name="emotions-api", daemon=True)
+    thread.start()
+    return thread
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON API for recording and querying emotion entries")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--queue-size", type=int, default=1000, help="Entries waiting to be written before posts are refused")
+    parser.add_argument("--batch-size", type=int, default=100, help="Most entries committed in one transaction")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    try:
+        tokens = parse_tokens(os.environ.get(TOKENS_ENV))
+    except ValueError as e:
+        parser.error(f"{TOKENS_ENV}: {e}")
+    if not tokens and args.host not in LOOPBACK_HOSTS:
+        print(f"Warning: serving on {args.host} without {TOKENS_ENV}; anyone who can connect can read and write every journal")
+
+    initialize_db()
+    writer = BackgroundWriter(max_queue=args.queue_size, batch_size=args.batch_size)
+    server = make_server(args.host, args.port, writer, verbose=args.verbose, tokens=tokens)
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        writer.close()
+
+if __name__ == "__main__":
+    main()
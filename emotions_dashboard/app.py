@@ -1,16 +1,22 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-import sqlite3
+import io
 import os
+import queue
+import tempfile
+import time
+from datetime import datetime, timedelta
 
-# Import custom modules
-from database import initialize_db, save_entry, get_all_entries, get_entries_by_date_range
-from sentiment import analyze_sentiment
+# Import custom modules. Plotting and word cloud libraries are imported inside
+# the functions that draw with them, so opening the app (or only recording an
+# entry) does not pay for loading them.
+from database import initialize_db, get_entries_page, get_date_bounds, get_daily_rollup, get_term_frequencies, get_sentiment_series, get_generation, search_entries, ENTRY_COLUMNS, DEFAULT_USER
+from export import FORMATS as EXPORT_FORMATS, available_formats, export_entries
 from utils import generate_motivational_message
+from cache import ImageCache
+import charts
+from writer import get_writer
+from sentiment import get_cache_stats
+import metrics
 
 # Set page configuration with dark theme
 st.set_page_config(
@@ -60,58 +66,148 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def initialize_db_once():
+    """Create and migrate the schema once per server process rather than on every rerun"""
+    initialize_db()
+    return True
+
+# The app has no sign-in of its own, so visitors never pick a journal: each
+# deployment serves the one named by EMOTIONS_JOURNAL. With
+# EMOTIONS_JOURNAL_PER_USER set, viewers signed in through the hosting
+# platform (st.experimental_user) each get a journal of their own instead.
+JOURNAL = os.environ.get('EMOTIONS_JOURNAL', '').strip() or DEFAULT_USER
+JOURNAL_PER_USER = os.environ.get('EMOTIONS_JOURNAL_PER_USER', '').lower() in ('1', 'true', 'on', 'yes')
+
+def current_journal():
+    """
+    Journal of the current session, taken from the deployment or the signed-in viewer.
+    
+    Returns:
+        str: The journal (user_id) every read and write is scoped to, or None
+            when journals are per viewer and nobody is signed in
+    """
+    if not JOURNAL_PER_USER:
+        return JOURNAL
+    email = st.experimental_user.get('email')
+    return email.strip().lower() if email else None
+
+# Seconds between reruns while a saved entry is still being scored and written,
+# and how long to keep checking before giving up on it
+PENDING_POLL_SECONDS = 0.5
+PENDING_TIMEOUT_SECONDS = 60
+
+@st.cache_resource
+def get_background_writer():
+    """Process-wide writer that scores and saves entries off the request path"""
+    return get_writer()
+
+# Cached reads. Each takes the journal and its data generation as arguments,
+# so any write to that journal produces a new cache key and results are never
+# stale, while reruns with unchanged data (or writes to other journals) are
+# answered from the caches. main() reads the generation once per rerun, a
+# single primary key lookup, and that is the only query such a rerun makes.
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_date_bounds(user_id, generation):
+    """Earliest and latest entry dates, or None when there are no entries"""
+    bounds = get_date_bounds(user_id)
+    if not bounds or bounds[0] is None:
+        return None
+    return bounds
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_entries_page(start_date, end_date, limit, before, sentiment, user_id, generation):
+    """Cached get_entries_page"""
+    return get_entries_page(start_date, end_date, limit, before, sentiment, user_id)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_daily_rollup(start_date, end_date, user_id, generation):
+    """Cached get_daily_rollup"""
+    return get_daily_rollup(start_date, end_date, user_id)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_sentiment_series(start_date, end_date, user_id, generation):
+    """Cached get_sentiment_series at the automatic resolution"""
+    return get_sentiment_series(start_date, end_date, user_id=user_id)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_term_frequencies(start_date, end_date, limit, user_id, generation):
+    """Cached get_term_frequencies"""
+    return get_term_frequencies(start_date, end_date, limit=limit, user_id=user_id)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_search_results(query, start_date, end_date, sentiment, limit, user_id, generation):
+    """Cached search_entries"""
+    return search_entries(query, start_date, end_date, sentiment, limit=limit, user_id=user_id)
+
 def main():
     # Initialize database
-    initialize_db()
+    initialize_db_once()
     
     # App title
     st.title("Emotions Dashboard")
     st.subheader("Track and visualize your emotional journey")
     
+    # Every read and write below is scoped to the session's journal
+    user_id = current_journal()
+    if user_id is None:
+        st.warning("Please sign in to see your journal.")
+        return
+    generation = get_generation(user_id)
+    
     # Sidebar
     with st.sidebar:
         st.header("Filters & Options")
+        st.caption(f"Journal: {user_id}")
         
         # Date range filter
         st.subheader("Date Range")
         
         # Get min and max dates from database
-        db_path = os.path.join(os.path.dirname(__file__), 'emotions.db')
-        conn = sqlite3.connect(db_path)
         try:
-            df = pd.read_sql_query("SELECT date FROM emotions", conn)
-            if not df.empty:
-                min_date = pd.to_datetime(df['date']).min().date()
-                max_date = pd.to_datetime(df['date']).max().date()
-            else:
-                min_date = datetime.now().date() - timedelta(days=30)
-                max_date = datetime.now().date()
+            bounds = load_date_bounds(user_id, generation)
         except:
+            bounds = None
+        if bounds:
+            min_date, max_date = bounds
+        else:
             min_date = datetime.now().date() - timedelta(days=30)
             max_date = datetime.now().date()
-        finally:
-            conn.close()
         
         start_date = st.date_input("Start date", min_date)
         end_date = st.date_input("End date", max_date)
         
         # Export options
         st.subheader("Export Options")
-        if st.button("Export to CSV"):
-            entries = get_all_entries()
-            if entries is not None and not entries.empty:
-                csv_file = entries.to_csv(index=False)
+        export_format = st.selectbox("Format", available_formats())
+        export_columns = st.multiselect("Columns", list(ENTRY_COLUMNS), default=list(ENTRY_COLUMNS))
+        export_range_only = st.checkbox("Only the selected date range")
+        if st.button("Export"):
+            # Stream rows from the database into a spooled file rather than a full DataFrame
+            with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as f:
+                written = export_entries(
+                    f,
+                    export_format,
+                    start_date if export_range_only else None,
+                    end_date if export_range_only else None,
+                    export_columns,
+                    user_id=user_id,
+                )
+                f.seek(0)
+                export_data = f.read() if written else None
+            if export_data:
                 st.download_button(
-                    label="Download CSV",
-                    data=csv_file,
-                    file_name="emotions_data.csv",
-                    mime="text/csv"
+                    label=f"Download {export_format.upper()}",
+                    data=export_data,
+                    file_name=f"emotions_data.{export_format}",
+                    mime=EXPORT_FORMATS[export_format]
                 )
             else:
                 st.warning("No data to export")
     
     # Main content area - split into tabs
-    tab1, tab2 = st.tabs(["Record Emotion", "Dashboard"])
+    tab1, tab2, tab3 = st.tabs(["Record Emotion", "Dashboard", "Entries"])
     
     # Tab 1: Record Emotion
     with tab1:
@@ -121,158 +217,302 @@ def main():
         emotion_text = st.text_area("Express your feelings", height=150, 
                                     placeholder="Write how you're feeling today...")
         
+        # Entry handed to the background writer on an earlier run; its result
+        # is shown once it is committed
+        saved_sentiment = None
+        pending_entry = st.session_state.get('pending_entry')
+        if pending_entry is not None and not pending_entry.done() and (
+            not get_background_writer().alive()
+            or time.monotonic() > st.session_state.get('pending_deadline', 0)
+        ):
+            # The writer stopped or is stuck: stop rerunning for an entry
+            # that may never be saved
+            del st.session_state['pending_entry']
+            st.error("Your entry could not be saved. Please try again")
+        elif pending_entry is not None and pending_entry.done():
+            del st.session_state['pending_entry']
+            if pending_entry.exception() is not None:
+                st.error(f"Error saving entry: {pending_entry.exception()}")
+            else:
+                saved_sentiment = pending_entry.result()[0]
+        elif pending_entry is not None:
+            st.info("Entry received. Analyzing your emotion...")
+        if saved_sentiment:
+            # Display sentiment result
+            sentiment_color = {
+                "Positive": "sentiment-positive",
+                "Negative": "sentiment-negative",
+                "Neutral": "sentiment-neutral"
+            }
+            
+            st.markdown(f"Your emotion has been analyzed as: <span class='{sentiment_color[saved_sentiment]}'>{saved_sentiment}</span>", 
+                        unsafe_allow_html=True)
+            
+            # Display motivational message
+            message = generate_motivational_message(saved_sentiment)
+            st.markdown(f"<div class='motivational-message'>{message}</div>", unsafe_allow_html=True)
+        
         # Submit button
         if st.button("Save Entry"):
             if emotion_text.strip():
-                # Analyze sentiment
-                sentiment_category, sentiment_score = analyze_sentiment(emotion_text)
-                
-                # Save to database
-                save_entry(emotion_text, sentiment_category, sentiment_score)
-                
-                # Display sentiment result
-                sentiment_color = {
-                    "Positive": "sentiment-positive",
-                    "Negative": "sentiment-negative",
-                    "Neutral": "sentiment-neutral"
-                }
-                
-                st.markdown(f"Your emotion has been analyzed as: <span class='{sentiment_color[sentiment_category]}'>{sentiment_category}</span>", 
-                            unsafe_allow_html=True)
-                
-                # Display motivational message
-                message = generate_motivational_message(sentiment_category)
-                st.markdown(f"<div class='motivational-message'>{message}</div>", unsafe_allow_html=True)
-                
-                # Clear the input
-                st.rerun()
+                # Scoring and saving happen on the background writer; the
+                # entry is acknowledged right away
+                try:
+                    st.session_state['pending_entry'] = get_background_writer().submit(emotion_text, timeout=5, user_id=user_id)
+                    st.session_state['pending_deadline'] = time.monotonic() + PENDING_TIMEOUT_SECONDS
+                    st.info("Entry received. Analyzing your emotion...")
+                except queue.Full:
+                    st.warning("Too many entries are being saved right now. Please try again in a moment")
             else:
                 st.warning("Please enter some text before submitting")
     
     # Tab 2: Dashboard
     with tab2:
-        show_dashboard(start_date, end_date)
+        show_dashboard(start_date, end_date, user_id, generation)
+    
+    # Tab 3: Entry browser
+    with tab3:
+        show_entry_browser(start_date, end_date, user_id, generation)
+    
+    if metrics.enabled():
+        show_performance()
+    
+    # While an entry is being saved, the page above is already complete; check
+    # back shortly so its result, and a dashboard including it, show up
+    if 'pending_entry' in st.session_state:
+        time.sleep(PENDING_POLL_SECONDS)
+        st.experimental_rerun()
+
+# Word cloud look: width, height, background color, colormap, max words
+WORDCLOUD_PARAMS = (800, 400, '#0E1117', 'viridis', 100)
+
+@st.cache_resource
+def get_wordcloud_cache():
+    """Process-wide cache of rendered word cloud PNGs, shared by all sessions"""
+    return ImageCache(
+        max_bytes=int(os.environ.get('EMOTIONS_WORDCLOUD_CACHE_BYTES', 32 * 1024 * 1024)),
+        spill_dir=os.environ.get('EMOTIONS_WORDCLOUD_CACHE_DIR') or None,
+    )
+
+@metrics.instrument("dashboard.wordcloud.render")
+def render_wordcloud(frequencies):
+    """
+    Render a word cloud from term frequencies to PNG bytes.
+    
+    Args:
+        frequencies (dict): Mapping of term to count
+    
+    Returns:
+        bytes: The encoded PNG, or empty bytes when there are no terms
+    """
+    if not frequencies:
+        return b""
+    from wordcloud import WordCloud
+    
+    width, height, background_color, colormap, max_words = WORDCLOUD_PARAMS
+    wordcloud = WordCloud(
+        width=width, 
+        height=height, 
+        background_color=background_color,
+        colormap=colormap,
+        max_words=max_words
+    ).generate_from_frequencies(frequencies)
+    
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
 
-def show_dashboard(start_date, end_date):
-    """Renders the dashboard visualizations"""
+def build_timeline_figure(start_date, end_date, user_id, generation):
+    """Sentiment timeline chart, bucketed in SQL to stay within SERIES_MAX_POINTS"""
+    series = load_sentiment_series(start_date, end_date, user_id, generation)
+    if series is None:
+        return None
+    return charts.timeline_from_series(*series)
+
+@metrics.instrument("dashboard.total")
+def show_dashboard(start_date, end_date, user_id=DEFAULT_USER, generation=None):
+    """Renders the dashboard visualizations for one journal, as of the given data generation"""
     st.header("Emotions Dashboard")
     
-    # Get data filtered by date range
-    df = get_entries_by_date_range(start_date, end_date)
+    if generation is None:
+        generation = get_generation(user_id)
+    
+    # Per-day totals drive the charts, so their cost follows the number of days
+    with metrics.timer("dashboard.load_rollup"):
+        rollup = load_daily_rollup(start_date, end_date, user_id, generation)
     
-    if df is None or df.empty:
+    if rollup is None or rollup.empty:
         st.info("No data available for the selected date range. Start by recording your emotions!")
         return
     
-    # Convert date column to datetime
-    df['date'] = pd.to_datetime(df['date'])
-    
     # Create three columns for the visualizations
     col1, col2 = st.columns(2)
     
-    with col1:
+    # Figures are built once per journal, range and data generation, then
+    # reused by every rerun and session until the data changes
+    chart_key = (user_id, str(start_date), str(end_date), generation)
+    
+    with col1, metrics.timer("dashboard.distribution"):
         st.subheader("Sentiment Distribution")
-        # Count sentiments
-        sentiment_counts = df['sentiment'].value_counts().reset_index()
-        sentiment_counts.columns = ['Sentiment', 'Count']
-        
-        # Create bar chart with Plotly
-        fig = px.bar(
-            sentiment_counts, 
-            x='Sentiment', 
-            y='Count',
-            color='Sentiment',
-            color_discrete_map={
-                'Positive': '#4CAF50',
-                'Negative': '#F44336',
-                'Neutral': '#2196F3'
-            },
-            text='Count'
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=False)
-        )
+        with metrics.timer("dashboard.distribution.figure"):
+            fig = charts.cached_figure(('distribution',) + chart_key, lambda: charts.distribution_from_rollup(rollup))
         st.plotly_chart(fig, use_container_width=True)
     
-    with col2:
+    with col2, metrics.timer("dashboard.timeline"):
         st.subheader("Sentiment Over Time")
-        # Group by date and calculate average sentiment score
-        daily_sentiment = df.groupby(df['date'].dt.date)['sentiment_score'].mean().reset_index()
-        
-        # Create line chart with Plotly
-        fig = px.line(
-            daily_sentiment, 
-            x='date', 
-            y='sentiment_score',
-            markers=True
-        )
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='white'),
-            xaxis=dict(showgrid=False, title='Date'),
-            yaxis=dict(showgrid=False, title='Sentiment Score')
-        )
-        # Add a horizontal line at y=0
-        fig.add_shape(
-            type="line",
-            x0=daily_sentiment['date'].min(),
-            y0=0,
-            x1=daily_sentiment['date'].max(),
-            y1=0,
-            line=dict(color="gray", width=1, dash="dash")
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with metrics.timer("dashboard.timeline.figure"):
+            fig = charts.cached_figure(
+                ('timeline',) + chart_key,
+                lambda: build_timeline_figure(start_date, end_date, user_id, generation)
+            )
+        if fig is None:
+            st.error("Could not load the sentiment timeline")
+        else:
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("The band spans the lowest to highest entry score; the dotted line is a rolling average")
     
     # Word Cloud
-    st.subheader("Word Cloud")
-    
-    # Combine all text entries
-    all_text = " ".join(df['text'].tolist())
-    
-    if all_text.strip():
-        # Generate word cloud
-        wordcloud = WordCloud(
-            width=800, 
-            height=400, 
-            background_color='#0E1117',
-            colormap='viridis',
-            max_words=100
-        ).generate(all_text)
+    with metrics.timer("dashboard.wordcloud"):
+        st.subheader("Word Cloud")
         
-        # Display the word cloud
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis("off")
-        plt.tight_layout(pad=0)
-        st.pyplot(plt)
-    else:
-        st.info("Not enough text data to generate a word cloud")
+        # The rendered image only changes when the range, the data or the look does
+        cache = get_wordcloud_cache()
+        cache_key = (user_id, str(start_date), str(end_date), generation, WORDCLOUD_PARAMS)
+        image = cache.get(cache_key)
+        if image is None:
+            metrics.increment("dashboard.wordcloud.cache_misses")
+            image = render_wordcloud(load_term_frequencies(start_date, end_date, WORDCLOUD_PARAMS[4], user_id, generation))
+            cache.put(cache_key, image)
+        else:
+            metrics.increment("dashboard.wordcloud.cache_hits")
+        
+        if image:
+            st.image(image, use_column_width=True)
+        else:
+            st.info("Not enough text data to generate a word cloud")
     
     # Recent entries
-    st.subheader("Recent Entries")
-    recent_df = df.sort_values(by='date', ascending=False).head(5)
+    with metrics.timer("dashboard.recent_entries"):
+        st.subheader("Recent Entries")
+        # The latest entries are one short read from the (user_id, date) index
+        page = load_entries_page(start_date, end_date, 5, None, None, user_id, generation)
+        if page is not None:
+            show_entries_table(page[0])
     
+    # Full-text search
+    with metrics.timer("dashboard.search"):
+        show_search(start_date, end_date, user_id, generation)
+
+def style_sentiment(val):
+    """Background colour of a sentiment cell"""
+    color_map = {
+        'Positive': 'background-color: rgba(76, 175, 80, 0.2)',
+        'Negative': 'background-color: rgba(244, 67, 54, 0.2)',
+        'Neutral': 'background-color: rgba(33, 150, 243, 0.2)'
+    }
+    return color_map.get(val, '')
+
+def show_entries_table(entries):
+    """Renders entries as a Date/Entry/Sentiment table with coloured sentiments"""
     # Format the dataframe for display
-    display_df = recent_df[['date', 'text', 'sentiment']].copy()
-    display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d %H:%M')
+    display_df = entries[['date', 'text', 'sentiment']].copy()
+    display_df['date'] = display_df['date'].str[:16]
     display_df.columns = ['Date', 'Entry', 'Sentiment']
     
-    # Apply styling to the dataframe
-    def style_sentiment(val):
-        color_map = {
-            'Positive': 'background-color: rgba(76, 175, 80, 0.2)',
-            'Negative': 'background-color: rgba(244, 67, 54, 0.2)',
-            'Neutral': 'background-color: rgba(33, 150, 243, 0.2)'
-        }
-        return color_map.get(val, '')
-    
     # Display styled dataframe
     st.dataframe(display_df.style.applymap(style_sentiment, subset=['Sentiment']), use_container_width=True)
 
+def show_entry_browser(start_date, end_date, user_id=DEFAULT_USER, generation=None):
+    """Renders every entry in the date range, one page at a time, newest first"""
+    if generation is None:
+        generation = get_generation(user_id)
+    st.header("Your Entries")
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Entries per page", [10, 25, 50, 100], index=1)
+    with col2:
+        sentiment = st.selectbox("Show", ["All", "Positive", "Negative", "Neutral"], key="browse_sentiment")
+    sentiment = None if sentiment == "All" else sentiment
+    
+    # Cursors of the pages before the current one; changing what is browsed
+    # goes back to the newest page
+    view = (user_id, start_date, end_date, page_size, sentiment)
+    cursors = st.session_state.get('browse_cursors')
+    if cursors is None or st.session_state.get('browse_view') != view:
+        cursors = [None]
+        st.session_state['browse_view'] = view
+        st.session_state['browse_cursors'] = cursors
+    
+    page = load_entries_page(start_date, end_date, page_size, cursors[-1], sentiment, user_id, generation)
+    if page is None:
+        st.error("Could not load entries. Please try again.")
+        return
+    entries, next_cursor = page
+    if entries.empty:
+        st.info("No entries in the selected date range.")
+        return
+    
+    show_entries_table(entries)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("Newer", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with col2:
+        st.caption(f"Page {len(cursors)}")
+    with col3:
+        st.button("Older", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
+
+def show_search(start_date, end_date, user_id, generation):
+    """Renders the entry search box and its ranked results"""
+    st.subheader("Search Entries")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Search your entries", placeholder="e.g. coffee, work stress, grat*")
+    with col2:
+        sentiment = st.selectbox("Sentiment", ["Any", "Positive", "Negative", "Neutral"])
+    if not query.strip():
+        return
+    
+    results = load_search_results(query, start_date, end_date, None if sentiment == "Any" else sentiment, 50, user_id, generation)
+    if results is None:
+        st.error("Search failed. Please try again.")
+    elif results.empty:
+        st.info("No entries match your search in the selected date range.")
+    else:
+        st.caption(f"Best {len(results)} matches")
+        show_entries_table(results)
+
+def show_performance():
+    """Renders the collected timings, counters and recent queries (EMOTIONS_METRICS=1)"""
+    import pandas as pd
+    
+    with st.expander("Performance"):
+        snapshot = metrics.snapshot()
+        st.caption("Timings since the server started, slowest total first")
+        if snapshot['timers']:
+            timers = pd.DataFrame.from_dict(snapshot['timers'], orient='index').sort_values('total_ms', ascending=False)
+            st.dataframe(timers.round(2), use_container_width=True)
+        
+        # Cache counters are kept by the caches themselves; report them alongside
+        gauges = {f"sentiment.cache.{name}": value for name, value in get_cache_stats().items()}
+        gauges.update({f"wordcloud.cache.{name}": value for name, value in get_wordcloud_cache().stats().items()})
+        gauges.update({f"charts.cache.{name}": value for name, value in charts.cache_stats().items()})
+        counters = dict(snapshot['counters'], **gauges)
+        if counters:
+            st.dataframe(pd.Series(counters, name='value'), use_container_width=True)
+        
+        st.caption("Recent database calls")
+        if snapshot['queries']:
+            queries = pd.DataFrame(snapshot['queries'][:50])
+            queries['time'] = pd.to_datetime(queries['time'], unit='s').dt.strftime('%H:%M:%S')
+            st.dataframe(queries.round({'ms': 2}), use_container_width=True)
+        
+        st.download_button(
+            label="Download Prometheus metrics",
+            data=metrics.to_prometheus(gauges),
+            file_name="emotions_metrics.prom",
+            mime="text/plain"
+        )
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import database
+import sentiment
+
+# Vocabulary of the synthetic journal: mood words the sentiment backends score,
+# plus everyday words that give the word cloud something to count
+MOOD_WORDS = (
+    "happy sad calm tired great terrible good bad wonderful awful okay relaxed "
+    "stressed excited angry peaceful anxious grateful lonely proud bored hopeful"
+).split()
+COMMON_WORDS = (
+    "today work friends family walk rain sun coffee dinner meeting project gym "
+    "morning evening weekend sleep music book call lunch home city park"
+).split()
+FILLER_WORDS = "i felt was really very not quite a the my and but so with at".split()
+
+# Journal sizes benchmarked by default
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+def generate_journal(count, days=365, end=date(2024, 12, 31), seed=0):
+    """
+    Generate synthetic journal entries, spread evenly over a date range.
+
+    Scores are random rather than computed, so that large journals can be
+    generated without paying for sentiment analysis.
+
+    Args:
+        count (int): Number of entries
+        days (int): Number of days the entries span, ending at end
+        end (datetime.date): Date of the last entry
+        seed (int): Random seed, for repeatable runs
+
+    Yields:
+        tuple: (text, sentiment, sentiment_score, date) in date order
+    """
+    rng = random.Random(seed)
+    first = datetime(end.year, end.month, end.day) - timedelta(days=days - 1)
+    step = days * 86400 / count if count else 0
+    for i in range(count):
+        words = rng.choices(MOOD_WORDS, k=rng.randint(1, 3))
+        words += rng.choices(COMMON_WORDS, k=rng.randint(2, 8))
+        words += rng.choices(FILLER_WORDS, k=rng.randint(2, 12))
+        rng.shuffle(words)
+        score = round(rng.uniform(-1.0, 1.0), 3)
+        timestamp = first + timedelta(seconds=int(i * step))
+        yield (" ".join(words), sentiment.categorize_polarity(score), score, timestamp)
+
+def _timed(function, repeat=5):
+    """Run a function several times and return (median seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+def bench_scoring(sample_size, seed=0):
+    """Throughput of analyze_sentiment with a cold and a warm cache, and of bulk scoring."""
+    texts = [text for text, _, _, _ in generate_journal(sample_size, seed=seed + 1)]
+    results = {"texts": len(texts)}
+
+    sentiment.configure_cache(enabled=False)
+    sentiment.analyze_sentiment("warm up")
+    start = time.perf_counter()
+    for text in texts:
+        sentiment.analyze_sentiment(text)
+    results["analyze_sentiment_uncached_per_sec"] = len(texts) / (time.perf_counter() - start)
+
+    sentiment.configure_cache(max_items=len(texts) + 1)
+    for text in texts:
+        sentiment.analyze_sentiment(text)
+    start = time.perf_counter()
+    for text in texts:
+        sentiment.analyze_sentiment(text)
+    results["analyze_sentiment_cached_per_sec"] = len(texts) / (time.perf_counter() - start)
+
+    sentiment.configure_cache(enabled=False)
+    start = time.perf_counter()
+    sentiment.analyze_sentiments(texts, backend="lexicon")
+    results["bulk_lexicon_per_sec"] = len(texts) / (time.perf_counter() - start)
+    sentiment.configure_cache()
+    return results
+
+def bench_storage(count, single_inserts, seed=0):
+    """Row-at-a-time versus bulk insert rates; leaves the journal in the database."""
+    results = {}
+    singles = list(generate_journal(single_inserts, seed=seed + 2))
+    start = time.perf_counter()
+    for text, category, score, timestamp in singles:
+        database.save_entry(text, category, score, timestamp)
+    results["save_entry_per_sec"] = len(singles) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    inserted = database.save_entries(generate_journal(count, seed=seed), batch_size=5000)
+    elapsed = time.perf_counter() - start
+    results["save_entries_rows"] = inserted
+    results["save_entries_per_sec"] = inserted / elapsed
+    results["database_bytes"] = sum(
+        os.path.getsize(path) for path in (database.DB_PATH, database.DB_PATH + "-wal") if os.path.exists(path)
+    )
+    return results
+
+def bench_reads(repeat, end=date(2024, 12, 31)):
+    """Latency of range reads and of every data step behind show_dashboard."""
+    results = {}
+    for days in (7, 30, 365):
+        start = end - timedelta(days=days - 1)
+        seconds, df = _timed(lambda: database.get_entries_by_date_range(start, end), repeat)
+        results[f"entries_{days}d_ms"] = seconds * 1000
+        results[f"entries_{days}d_rows"] = len(df)
+
+    # The steps show_dashboard runs for a 30-day range, without Streamlit's caches
+    start = end - timedelta(days=29)
+    steps = {
+        "generation": lambda: database.get_generation(database.DEFAULT_USER),
+        "date_bounds": database.get_date_bounds,
+        "daily_rollup": lambda: database.get_daily_rollup(start, end),
+        "term_frequencies": lambda: database.get_term_frequencies(start, end, limit=100),
+        "sentiment_series": lambda: database.get_sentiment_series(start, end),
+        "recent_entries": lambda: database.get_entries_page(start, end, limit=5),
+    }
+    for name, step in steps.items():
+        seconds, _ = _timed(step, repeat)
+        results[f"dashboard_{name}_ms"] = seconds * 1000
+
+    # Full-text search for one of the commonest words, the slowest case to rank
+    searches = {
+        "search_ms": lambda: database.search_entries("happy"),
+        "search_30d_ms": lambda: database.search_entries("happy", start, end, sentiment="Positive"),
+    }
+    for name, search in searches.items():
+        seconds, _ = _timed(search, repeat)
+        results[name] = seconds * 1000
+
+    rollup = database.get_daily_rollup(start, end)
+    seconds, _ = _timed(lambda: rollup[["positive_count", "negative_count", "neutral_count"]].sum(), repeat)
+    results["dashboard_summaries_ms"] = seconds * 1000
+    return results
+
+def _px_figures(series, counts):
+    """The dashboard's charts as show_dashboard built them with plotly express, for comparison."""
+    import plotly.express as px
+
+    fig_bar = px.bar(
+        counts, x="Sentiment", y="Count", color="Sentiment", text="Count",
+        color_discrete_map={"Positive": "#4CAF50", "Negative": "#F44336", "Neutral": "#2196F3"},
+    )
+    fig_bar.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font=dict(color="white"),
+        xaxis=dict(showgrid=False), yaxis=dict(showgrid=False),
+    )
+    fig_line = px.line(series, x="bucket", y="mean_score", markers=True)
+    fig_line.add_scatter(x=series["bucket"], y=series["score_max"], mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False)
+    fig_line.add_scatter(
+        x=series["bucket"], y=series["score_min"], mode="lines", line=dict(width=0), fill="tonexty",
+        fillcolor="rgba(33, 150, 243, 0.15)", hoverinfo="skip", showlegend=False,
+    )
+    fig_line.add_scatter(
+        x=series["bucket"], y=series["rolling_mean"], mode="lines",
+        line=dict(color="#FFC107", width=2, dash="dot"), name="7-day average",
+    )
+    fig_line.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font=dict(color="white"),
+        xaxis=dict(showgrid=False, title="Date"), yaxis=dict(showgrid=False, title="Sentiment Score"),
+        legend=dict(orientation="h", y=-0.25),
+    )
+    fig_line.add_shape(
+        type="line", x0=series["bucket"].min(), y0=0, x1=series["bucket"].max(), y1=0,
+        line=dict(color="gray", width=1, dash="dash"),
+    )
+    return fig_bar, fig_line
+
+def bench_charts(repeat, points=(30, database.SERIES_MAX_POINTS), seed=0):
+    """Build and serialization time of the dashboard charts: plotly express versus charts.py."""
+    import pandas as pd
+
+    import charts
+
+    rng = random.Random(seed)
+    results = {}
+    for count in points:
+        buckets = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(count)]
+        means = [rng.uniform(-0.5, 0.5) for _ in buckets]
+        series = pd.DataFrame({
+            "bucket": pd.to_datetime(buckets),
+            "entries": [rng.randint(1, 10) for _ in buckets],
+            "mean_score": means,
+            "score_min": [mean - 0.4 for mean in means],
+            "score_max": [mean + 0.4 for mean in means],
+            "rolling_mean": pd.Series(means).rolling(7, min_periods=1).mean(),
+        })
+        counts = pd.DataFrame({"Sentiment": ["Positive", "Negative", "Neutral"], "Count": [40, 25, 35]})
+
+        seconds, px_figures = _timed(lambda: _px_figures(series, counts), repeat)
+        results[f"px_{count}_build_ms"] = seconds * 1000
+        seconds, px_json = _timed(lambda: [figure.to_json() for figure in px_figures], repeat)
+        results[f"px_{count}_json_ms"] = seconds * 1000
+        results[f"px_{count}_json_bytes"] = sum(len(text) for text in px_json)
+
+        compact = series.assign(bucket=buckets)
+
+        def build():
+            return charts.distribution_figure(40, 25, 35), charts.timeline_from_series("day", compact)
+
+        seconds, go_figures = _timed(build, repeat)
+        results[f"go_{count}_build_ms"] = seconds * 1000
+        seconds, go_json = _timed(lambda: [figure.to_json() for figure in go_figures], repeat)
+        results[f"go_{count}_json_ms"] = seconds * 1000
+        results[f"go_{count}_json_bytes"] = sum(len(text) for text in go_json)
+
+        # A rerun with unchanged data only looks the figures up
+        keys = [("bench-distribution", count), ("bench-timeline", count)]
+        for key, figure in zip(keys, go_figures):
+            charts.cached_figure_json(key, lambda: figure)
+        seconds, _ = _timed(lambda: [charts.cached_figure_json(key, None) for key in keys], repeat)
+        results[f"memoized_{count}_ms"] = seconds * 1000
+    return results
+
+def bench_wordcloud(repeat, end=date(2024, 12, 31)):
+    """Time to render the dashboard's word cloud from the term index."""
+    # The app module sets up its Streamlit page on import; outside
+    # `streamlit run` that only logs warnings
+    from app import render_wordcloud
+
+    frequencies = database.get_term_frequencies(end - timedelta(days=29), end, limit=100)
+    seconds, image = _timed(lambda: render_wordcloud(frequencies), repeat)
+    return {"wordcloud_render_ms": seconds * 1000, "wordcloud_png_bytes": len(image)}
+
+def run_benchmarks(sizes=DEFAULT_SIZES, score_sample=2000, single_inserts=500, repeat=5, workdir=None, seed=0):
+    """
+    Benchmark scoring and chart building once, then storage, reads and
+    dashboard rendering at several journal sizes.
+
+    Each size gets a fresh database in workdir; the journal's real database is
+    never touched.
+
+    Args:
+        sizes (iterable of int): Journal sizes to benchmark
+        score_sample (int): Number of texts scored by the scoring benchmarks
+        single_inserts (int): Number of entries saved one commit at a time
+        repeat (int): Repetitions per read timing; the median is reported
+        workdir (str): Directory for the benchmark databases, created if missing.
+            Defaults to a temporary one
+        seed (int): Random seed, for repeatable runs
+
+    Returns:
+        dict: Environment details, scoring results and per-size results
+    """
+    if workdir:
+        os.makedirs(workdir, exist_ok=True)
+    else:
+        workdir = tempfile.mkdtemp(prefix="emotions-bench-")
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "sentiment_backend": sentiment.get_analyzer().name,
+        },
+        "scoring": bench_scoring(score_sample, seed),
+        "charts": bench_charts(repeat, seed=seed),
+        "sizes": {},
+    }
+
+    original_path = database.DB_PATH
+    try:
+        for size in sizes:
+            database.close_connections()
+            database.DB_PATH = os.path.join(workdir, f"bench_{size}.db")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(database.DB_PATH + suffix):
+                    os.remove(database.DB_PATH + suffix)
+            database.initialize_db()
+
+            results = {}
+            results.update(bench_storage(size, single_inserts, seed))
+            results.update(bench_reads(repeat))
+            results.update(bench_wordcloud(repeat))
+            report["sizes"][str(size)] = results
+            print(f"Benchmarked {size} entries", file=sys.stderr)
+    finally:
+        database.close_connections()
+        database.DB_PATH = original_path
+    return report
+
+def _flatten(report):
+    """Map "section.size.metric" names to numbers, for comparing reports."""
+    flat = {}
+    for section in ("scoring", "charts"):
+        for name, value in report.get(section, {}).items():
+            flat[f"{section}.{name}"] = value
+    for size, results in report.get("sizes", {}).items():
+        for name, value in results.items():
+            flat[f"{size}.{name}"] = value
+    return flat
+
+def compare_reports(baseline, current, tolerance=0.2):
+    """
+    Find metrics that got worse by more than a tolerance.
+
+    Metrics ending in "_per_sec" are better when higher; those ending in "_ms"
+    are better when lower. Counts and sizes are not compared.
+
+    Args:
+        baseline (dict): Earlier report from run_benchmarks
+        current (dict): New report
+        tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: (metric, baseline value, current value) for every regression
+    """
+    old, new = _flatten(baseline), _flatten(current)
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        if not before or not after:
+            continue
+        if name.endswith("_per_sec") and after < before * (1 - tolerance):
+            regressions.append((name, before, after))
+        elif name.endswith("_ms") and after > before * (1 + tolerance):
+            regressions.append((name, before, after))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sentiment scoring, storage and dashboard queries")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated journal sizes")
+    parser.add_argument("--score-sample", type=int, default=2000, help="Texts scored by the scoring benchmarks")
+    parser.add_argument("--single-inserts", type=int, default=500, help="Entries saved one commit at a time")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per read timing")
+    parser.add_argument("--workdir", help="Directory for the benchmark databases (default: a temporary one)")
+    parser.add_argument("--output", help="Write the JSON report to this file as well as stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = run_benchmarks(sizes, args.score_sample, args.single_inserts, args.repeat, args.workdir)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report, args.tolerance)
+        for name, before, after in regressions:
+            print(f"Regression: {name} went from {before:.3f} to {after:.3f}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
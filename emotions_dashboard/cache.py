@@ -0,0 +1,378 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded least-recently-used cache with hit/miss counters.
+    """
+
+    def __init__(self, max_items=10000):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Look up a key, marking it as most recently used.
+
+        Args:
+            key: The cache key
+            default: Value returned when the key is not cached
+
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries when full.
+
+        Args:
+            key: The cache key
+            value: The value to store
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+def normalize_text(text):
+    """
+    Normalize text before hashing so that cosmetic differences share a cache entry.
+
+    Args:
+        text (str): The text to normalize
+
+    Returns:
+        str: NFC-normalized text with whitespace runs collapsed and trimmed
+    """
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def content_key(text, version):
+    """
+    Build a content-addressed cache key for a text.
+
+    Args:
+        text (str): The text being scored
+        version (str): Version of the analyzer producing the result
+
+    Returns:
+        str: Hex SHA-256 digest of the version and the normalized text
+    """
+    payload = f"{version}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+class SentimentCache:
+    """
+    Two-tier cache of sentiment results: an in-memory LRU in front of an
+    optional SQLite file that survives restarts.
+    """
+
+    def __init__(self, max_items=10000, path=None):
+        self.memory = LRUCache(max_items)
+        self.path = path
+        self.disk_hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                key TEXT PRIMARY KEY,
+                sentiment TEXT NOT NULL,
+                sentiment_score REAL NOT NULL
+            ) WITHOUT ROWID
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, texts, version):
+        """
+        Look up cached results for several texts.
+
+        Args:
+            texts (iterable of str): Texts to look up
+            version (str): Analyzer version the results must come from
+
+        Returns:
+            dict: Mapping of text to (sentiment_category, sentiment_score) for every hit
+        """
+        found = {}
+        pending = {}
+        for text in texts:
+            if text in found or text in pending:
+                continue
+            key = content_key(text, version)
+            result = self.memory.get(key)
+            if result is not None:
+                found[text] = result
+            else:
+                pending[text] = key
+
+        if pending and self.path:
+            keys = list(set(pending.values()))
+            rows = {}
+            with self._lock:
+                conn = self._connection()
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    batch = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    cursor = conn.execute(
+                        f"SELECT key, sentiment, sentiment_score FROM sentiment_cache WHERE key IN ({placeholders})",
+                        batch
+                    )
+                    for key, sentiment, score in cursor:
+                        rows[key] = (sentiment, score)
+            for text, key in list(pending.items()):
+                if key in rows:
+                    self.memory.put(key, rows[key])
+                    found[text] = rows[key]
+                    self.disk_hits += 1
+                    del pending[text]
+
+        self.misses += len(pending)
+        return found
+
+    def get(self, text, version):
+        """
+        Look up the cached result for a single text.
+
+        Args:
+            text (str): Text to look up
+            version (str): Analyzer version the result must come from
+
+        Returns:
+            tuple: (sentiment_category, sentiment_score), or None on a miss
+        """
+        return self.get_many([text], version).get(text)
+
+    def put_many(self, results, version):
+        """
+        Store results in both tiers.
+
+        Args:
+            results (dict): Mapping of text to (sentiment_category, sentiment_score)
+            version (str): Analyzer version that produced the results
+        """
+        rows = []
+        for text, result in results.items():
+            key = content_key(text, version)
+            self.memory.put(key, tuple(result))
+            rows.append((key, result[0], result[1]))
+
+        if rows and self.path:
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO sentiment_cache (key, sentiment, sentiment_score) VALUES (?, ?, ?)",
+                        rows
+                    )
+
+    def put(self, text, version, result):
+        """
+        Store the result for a single text.
+
+        Args:
+            text (str): The scored text
+            version (str): Analyzer version that produced the result
+            result (tuple): (sentiment_category, sentiment_score)
+        """
+        self.put_many({text: result}, version)
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Memory hits, disk hits, misses and the number of entries held in memory
+        """
+        return {
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_size": len(self.memory),
+        }
+
+    def clear(self):
+        """Drop the in-memory tier and reset the counters (the disk tier is kept)."""
+        self.memory.clear()
+        self.disk_hits = 0
+        self.misses = 0
+
+    def close(self):
+        """Close the persistent tier's connection, if open."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class ImageCache:
+    """
+    A byte-budgeted LRU cache for rendered images, optionally spilling evicted
+    images to a directory on disk instead of discarding them.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, spill_dir=None, max_spill_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.png")
+
+    def get(self, key):
+        """
+        Look up an image, checking memory first and then the spill directory.
+
+        Args:
+            key: A hashable key with a stable repr
+
+        Returns:
+            bytes: The image, or None on a miss
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+        if self.spill_dir:
+            path = self._spill_path(key)
+            try:
+                with open(path, "rb") as f:
+                    image = f.read()
+            except OSError:
+                image = None
+            if image is not None:
+                self.disk_hits += 1
+                self.put(key, image)
+                return image
+
+        self.misses += 1
+        return None
+
+    def put(self, key, image):
+        """
+        Store an image, evicting least recently used images beyond the byte budget.
+
+        Args:
+            key: A hashable key with a stable repr
+            image (bytes): The encoded image
+        """
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._size -= len(self._data.pop(key))
+            self._data[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes and len(self._data) > 1:
+                old_key, old_image = self._data.popitem(last=False)
+                self._size -= len(old_image)
+                evicted.append((old_key, old_image))
+
+        if self.spill_dir and evicted:
+            for old_key, old_image in evicted:
+                path = self._spill_path(old_key)
+                if not os.path.exists(path):
+                    with open(path, "wb") as f:
+                        f.write(old_image)
+            self._prune_spill_dir()
+
+    def _prune_spill_dir(self):
+        """Delete the oldest spilled images once the directory exceeds its budget."""
+        entries = []
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_spill_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Memory hits, disk hits, misses, images held in memory and their total size
+        """
+        with self._lock:
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._data),
+                "memory_bytes": self._size,
+            }
+
+def default_cache_path(db_path=None):
+    """
+    Location of the persistent sentiment cache, next to the emotions database.
+
+    Args:
+        db_path (str): Path of the emotions database. Defaults to the one
+            database.DB_PATH uses: EMOTIONS_DB_PATH, or emotions.db next to
+            this module
+
+    Returns:
+        str: Path to sentiment_cache.db
+    """
+    if db_path is None:
+        db_path = os.environ.get('EMOTIONS_DB_PATH', os.path.join(os.path.dirname(__file__), 'emotions.db'))
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'sentiment_cache.db')
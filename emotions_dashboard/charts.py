@@ -0,0 +1,207 @@
+import functools
+
+from cache import LRUCache
+from database import SERIES_RESOLUTIONS
+
+# Plotly is imported inside the functions that build figures, so importing this
+# module stays cheap for code paths that never draw a chart
+
+SENTIMENT_COLORS = {
+    "Positive": "#4CAF50",
+    "Negative": "#F44336",
+    "Neutral": "#2196F3",
+}
+ROLLING_COLOR = "#FFC107"
+BAND_COLOR = "rgba(33, 150, 243, 0.15)"
+
+# Decimals kept of the scores sent to the timeline chart
+SCORE_DECIMALS = 4
+
+# Built figures and their JSON, keyed by chart, journal, range and data generation
+FIGURE_CACHE_SIZE = 64
+_figures = LRUCache(max_items=FIGURE_CACHE_SIZE)
+
+@functools.lru_cache(maxsize=None)
+def layout_template():
+    """
+    Dark, transparent layout shared by every chart, built once per process.
+
+    Figures reference this small template instead of plotly's default one,
+    which is most of what a plotly express figure serializes.
+
+    Returns:
+        plotly.graph_objects.layout.Template: The template
+    """
+    import plotly.graph_objects as go
+
+    return go.layout.Template(layout=go.Layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="white"),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False),
+        margin=dict(l=40, r=20, t=20, b=40),
+    ))
+
+def distribution_figure(positive, negative, neutral):
+    """
+    Bar chart of how many entries fall in each sentiment category.
+
+    Args:
+        positive (int): Number of positive entries
+        negative (int): Number of negative entries
+        neutral (int): Number of neutral entries
+
+    Returns:
+        plotly.graph_objects.Figure: The chart, most common category first
+    """
+    import plotly.graph_objects as go
+
+    counts = [(label, count) for label, count in (("Positive", positive), ("Negative", negative), ("Neutral", neutral)) if count > 0]
+    counts.sort(key=lambda item: item[1], reverse=True)
+    labels = [label for label, _ in counts]
+    values = [count for _, count in counts]
+    return go.Figure(
+        data=[go.Bar(
+            x=labels,
+            y=values,
+            text=values,
+            marker_color=[SENTIMENT_COLORS[label] for label in labels],
+        )],
+        layout=go.Layout(template=layout_template(), xaxis_title="Sentiment", yaxis_title="Count"),
+    )
+
+def timeline_figure(buckets, mean_score, score_min, score_max, rolling_mean, rolling_label, axis_title="Date"):
+    """
+    Line chart of average sentiment per time bucket, with the range of entry
+    scores as a band and a rolling average.
+
+    Args:
+        buckets (sequence of str): First day of each bucket, YYYY-MM-DD
+        mean_score (sequence of float): Mean entry score of each bucket
+        score_min (sequence of float): Lowest entry score of each bucket
+        score_max (sequence of float): Highest entry score of each bucket
+        rolling_mean (sequence of float): Rolling average ending at each bucket
+        rolling_label (str): Legend label of the rolling average, e.g. '7-day average'
+        axis_title (str): Title of the time axis
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    import plotly.graph_objects as go
+
+    return go.Figure(
+        data=[
+            go.Scatter(x=buckets, y=score_max, mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False),
+            go.Scatter(
+                x=buckets, y=score_min, mode="lines", line=dict(width=0), fill="tonexty",
+                fillcolor=BAND_COLOR, hoverinfo="skip", name="Entry range",
+            ),
+            go.Scatter(x=buckets, y=mean_score, mode="lines+markers", line=dict(color=SENTIMENT_COLORS["Neutral"]), name="Average"),
+            go.Scatter(x=buckets, y=rolling_mean, mode="lines", line=dict(color=ROLLING_COLOR, width=2, dash="dot"), name=rolling_label),
+        ],
+        layout=go.Layout(
+            template=layout_template(),
+            xaxis_title=axis_title,
+            yaxis_title="Sentiment Score",
+            legend=dict(orientation="h", y=-0.25),
+            # Zero line across the whole plot, whatever the dates
+            shapes=[dict(type="line", xref="paper", x0=0, x1=1, y0=0, y1=0, line=dict(color="gray", width=1, dash="dash"))],
+        ),
+    )
+
+def distribution_from_rollup(rollup):
+    """
+    Sentiment distribution chart of the days in a get_daily_rollup result.
+
+    Args:
+        rollup (pandas.DataFrame): Per-day totals from get_daily_rollup
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    return distribution_figure(
+        int(rollup["positive_count"].sum()),
+        int(rollup["negative_count"].sum()),
+        int(rollup["neutral_count"].sum()),
+    )
+
+def timeline_from_series(resolution, series):
+    """
+    Sentiment timeline chart of a get_sentiment_series result.
+
+    Args:
+        resolution (str): Resolution of the series, one of SERIES_RESOLUTIONS
+        series (pandas.DataFrame): One row per bucket from get_sentiment_series
+
+    Returns:
+        plotly.graph_objects.Figure: The chart
+    """
+    window = SERIES_RESOLUTIONS[resolution][1]
+    # Four decimals are far below what a chart can show, and halve the payload
+    scores = series[["mean_score", "score_min", "score_max", "rolling_mean"]].round(SCORE_DECIMALS)
+    return timeline_figure(
+        series["bucket"].tolist(),
+        scores["mean_score"].to_numpy(),
+        scores["score_min"].to_numpy(),
+        scores["score_max"].to_numpy(),
+        scores["rolling_mean"].to_numpy(),
+        f"{window}-{resolution} average",
+        "Date" if resolution == "day" else f"{resolution.capitalize()} starting",
+    )
+
+def _entry(key, build):
+    """The [figure, json] cache entry of key, building the figure on a miss."""
+    entry = _figures.get(key)
+    if entry is None:
+        figure = build()
+        if figure is None:
+            return None
+        entry = [figure, None]
+        _figures.put(key, entry)
+    return entry
+
+def cached_figure(key, build):
+    """
+    Return the figure stored under key, building it on first use.
+
+    The key must change whenever the chart's data does, e.g. by including the
+    journal's data generation. Failed builds (None) are not cached.
+
+    Args:
+        key (tuple): Chart name, journal, range and data generation
+        build (callable): Returns the figure, or None when it cannot be built
+
+    Returns:
+        plotly.graph_objects.Figure: The figure, or None
+    """
+    entry = _entry(key, build)
+    return entry[0] if entry is not None else None
+
+def cached_figure_json(key, build):
+    """
+    Return the serialized JSON of the figure stored under key, serializing it
+    (and building it) only on first use.
+
+    Args:
+        key (tuple): As for cached_figure
+        build (callable): As for cached_figure
+
+    Returns:
+        str: The figure JSON, or None when the figure cannot be built
+    """
+    entry = _entry(key, build)
+    if entry is None:
+        return None
+    if entry[1] is None:
+        entry[1] = entry[0].to_json()
+    return entry[1]
+
+def cache_stats():
+    """
+    Report figure cache effectiveness.
+
+    Returns:
+        dict: Hits, misses and the number of figures held
+    """
+    return {"hits": _figures.hits, "misses": _figures.misses, "figures": len(_figures)}
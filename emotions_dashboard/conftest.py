@@ -0,0 +1,11 @@
+import pytest
+
+import database
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the database module at a throwaway file"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "emotions.db"))
+    database.initialize_db()
+    yield database.DB_PATH
+    database.close_connections()
@@ -1,31 +1,666 @@
+import atexit
+import hashlib
+import json
 import sqlite3
+import threading
 import pandas as pd
 import os
+from contextlib import contextmanager
 from datetime import datetime
 
+import metrics
+from word_index import count_terms, tokenize
+
+# Format of the timestamps stored in the date column
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Columns returned to callers; internal columns such as user_id and content_hash are left out
+ENTRY_COLUMNS = ('id', 'date', 'text', 'sentiment', 'sentiment_score')
+ENTRY_COLUMNS_SQL = ", ".join(ENTRY_COLUMNS)
+
+DB_PATH = os.environ.get('EMOTIONS_DB_PATH', os.path.join(os.path.dirname(__file__), 'emotions.db'))
+
+# Journal that entries belong to when no user is given, and that every entry
+# written before journals existed was assigned to
+DEFAULT_USER = 'default'
+
+# Time series resolutions from finest to coarsest: the SQL expression mapping a
+# rollup day to the first day of its bucket, how many calendar buckets the
+# rolling average spans, and the SQL expression numbering buckets
+# consecutively on the calendar, so the rolling window skips over empty ones
+SERIES_RESOLUTIONS = {
+    'day': ("day", 7, "CAST(julianday(bucket) AS INTEGER)"),
+    'week': ("date(day, '-6 days', 'weekday 1')", 4, "CAST(julianday(bucket) AS INTEGER) / 7"),
+    'month': ("substr(day, 1, 7) || '-01'", 3, "CAST(substr(bucket, 1, 4) AS INTEGER) * 12 + CAST(substr(bucket, 6, 2) AS INTEGER)"),
+    'year': ("substr(day, 1, 4) || '-01-01'", 3, "CAST(substr(bucket, 1, 4) AS INTEGER)"),
+}
+
+# Most points a time series returns when its resolution is chosen automatically
+SERIES_MAX_POINTS = 400
+
+# Most matching entries ranked per search; beyond that, only the newest
+# matches are ranked, which keeps searches for very common words fast
+SEARCH_CANDIDATES = 2000
+
+# Journals holding less than this share of the entry ids their dates span are
+# searched through the journal column of the FTS index. Larger journals are
+# faster to search by walking the matches of every journal in the id range
+SEARCH_JOURNAL_SHARE = 0.05
+
+# Applied once to every new connection
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # in KiB, i.e. ~16 MB of page cache
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+)
+
+class ConnectionPool:
+    """
+    A small pool of long-lived SQLite connections to one database file.
+    
+    Connections are handed out one caller at a time and returned to the pool
+    afterwards, so short-lived threads (such as Streamlit script runs) reuse
+    already-configured connections instead of reconnecting.
+    """
+    
+    def __init__(self, db_path, max_idle=4):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def _create(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name}={value}")
+        conn.create_function("content_hash", 2, _content_hash, deterministic=True)
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out of the pool for the duration of a with-block.
+        
+        Yields:
+            sqlite3.Connection: A configured connection
+        """
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._create()
+        try:
+            yield conn
+        finally:
+            # Never hand a half-finished transaction to the next caller
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if not self._closed and len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+    
+    def close(self):
+        """Close every idle connection and stop pooling new ones."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=None):
+    """
+    Get the connection pool for a database file, creating it on first use.
+    
+    Args:
+        db_path (str): Path to the database. Defaults to DB_PATH
+    
+    Returns:
+        ConnectionPool: The shared pool for that file
+    """
+    db_path = db_path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+def get_connection(db_path=None):
+    """
+    Check out a pooled connection, for use as a context manager.
+    
+    Args:
+        db_path (str): Path to the database. Defaults to DB_PATH
+    
+    Returns:
+        contextmanager: Yields a configured sqlite3.Connection
+    """
+    return get_pool(db_path).connection()
+
+def close_connections():
+    """
+    Close all pooled connections. Registered to run at interpreter shutdown.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+atexit.register(close_connections)
+
 def initialize_db():
     """
     Initialize the SQLite database and create the emotions table if it doesn't exist.
     """
-    db_path = os.path.join(os.path.dirname(__file__), 'emotions.db')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create table if it doesn't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS emotions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TIMESTAMP NOT NULL,
-        text TEXT NOT NULL,
-        sentiment TEXT NOT NULL,
-        sentiment_score REAL NOT NULL
+    with get_connection() as conn:
+        # Create table if it doesn't exist
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS emotions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TIMESTAMP NOT NULL,
+            text TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            sentiment_score REAL NOT NULL
+        )
+        ''')
+        conn.commit()
+        _migrate(conn)
+
+def _migration_date_indexes(conn):
+    """Index the date column for range queries and per-sentiment timelines."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emotions_date ON emotions (date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emotions_sentiment_date ON emotions (sentiment, date)")
+
+def _migration_daily_rollup(conn):
+    """Create the per-day sentiment rollup (filled by _migration_rollup_score_range)."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS daily_sentiment_rollup (
+        day TEXT PRIMARY KEY,
+        positive_count INTEGER NOT NULL DEFAULT 0,
+        negative_count INTEGER NOT NULL DEFAULT 0,
+        neutral_count INTEGER NOT NULL DEFAULT 0,
+        score_count INTEGER NOT NULL DEFAULT 0,
+        score_sum REAL NOT NULL DEFAULT 0,
+        score_sq_sum REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''')
+
+def _migration_term_index(conn):
+    """Create the per-day term frequency index (filled by _migration_user_id)."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS term_frequency (
+        day TEXT NOT NULL,
+        term TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, term)
+    ) WITHOUT ROWID
+    ''')
+
+def _migration_meta(conn):
+    """Create the key/value metadata table holding the data generation counter."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+
+def _migration_user_id(conn):
+    """
+    Partition entries and derived tables by journal. Existing entries join the
+    default journal; the rollup and term index are re-keyed by user (the term
+    index is rebuilt here, the rollup by _migration_rollup_score_range).
+    """
+    conn.execute(f"ALTER TABLE emotions ADD COLUMN user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+    # Every read is scoped to one journal, so the indexes lead with user_id
+    conn.execute("DROP INDEX IF EXISTS idx_emotions_date")
+    conn.execute("DROP INDEX IF EXISTS idx_emotions_sentiment_date")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emotions_user_date ON emotions (user_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emotions_user_sentiment_date ON emotions (user_id, sentiment, date)")
+    
+    conn.execute("DROP TABLE IF EXISTS daily_sentiment_rollup")
+    conn.execute('''
+    CREATE TABLE daily_sentiment_rollup (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        positive_count INTEGER NOT NULL DEFAULT 0,
+        negative_count INTEGER NOT NULL DEFAULT 0,
+        neutral_count INTEGER NOT NULL DEFAULT 0,
+        score_count INTEGER NOT NULL DEFAULT 0,
+        score_sum REAL NOT NULL DEFAULT 0,
+        score_sq_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID
+    ''')
+    
+    conn.execute("DROP TABLE IF EXISTS term_frequency")
+    conn.execute('''
+    CREATE TABLE term_frequency (
+        user_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        term TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (user_id, day, term)
+    ) WITHOUT ROWID
+    ''')
+    _rebuild_term_index(conn)
+    
+    # The global generation stays; each journal also gets its own
+    conn.execute(
+        "INSERT OR IGNORE INTO meta (key, value) SELECT ?, value FROM meta WHERE key = 'generation'",
+        (_generation_key(DEFAULT_USER),)
+    )
+
+def _migration_fts(conn):
+    """
+    Mirror entry text into an FTS5 index for ranked full-text search. The index
+    stores only the tokens (content comes from emotions) and triggers keep it
+    in sync with every insert, delete and text update.
+    """
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS emotions_fts USING fts5(
+        text,
+        content='emotions',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS emotions_fts_insert AFTER INSERT ON emotions BEGIN
+        INSERT INTO emotions_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS emotions_fts_delete AFTER DELETE ON emotions BEGIN
+        INSERT INTO emotions_fts (emotions_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS emotions_fts_update AFTER UPDATE OF text ON emotions BEGIN
+        INSERT INTO emotions_fts (emotions_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO emotions_fts (rowid, text) VALUES (new.id, new.text);
+    END
+    ''')
+    conn.execute("INSERT INTO emotions_fts (emotions_fts) VALUES ('rebuild')")
+
+def _migration_rollup_id_range(conn):
+    """
+    Record the lowest and highest entry id of each journal day in the rollup,
+    so searches over a date range only visit that range of the FTS index
+    (filled by _migration_rollup_score_range).
+    """
+    conn.execute("ALTER TABLE daily_sentiment_rollup ADD COLUMN min_id INTEGER")
+    conn.execute("ALTER TABLE daily_sentiment_rollup ADD COLUMN max_id INTEGER")
+
+def _migration_rollup_score_range(conn):
+    """
+    Record the lowest and highest sentiment score of each journal day in the
+    rollup, for the min/max bands of the time series, and refill the rollup.
+    """
+    conn.execute("ALTER TABLE daily_sentiment_rollup ADD COLUMN score_min REAL")
+    conn.execute("ALTER TABLE daily_sentiment_rollup ADD COLUMN score_max REAL")
+    _rebuild_rollup(conn)
+
+def _migration_content_hash(conn):
+    """
+    Fingerprint each entry's date and text, so imports can skip entries that
+    are already in their journal.
+    """
+    conn.execute("ALTER TABLE emotions ADD COLUMN content_hash INTEGER")
+    conn.execute("UPDATE emotions SET content_hash = content_hash(date, text)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emotions_user_hash ON emotions (user_id, content_hash)")
+
+def _migration_fts_user_id(conn):
+    """
+    Index each entry's journal in emotions_fts next to its text, so a search
+    only walks the matches of one journal rather than those of every journal
+    in the id range. The journal column is left out of BM25 ranking.
+    """
+    for trigger in ("emotions_fts_insert", "emotions_fts_delete", "emotions_fts_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS emotions_fts")
+    conn.execute('''
+    CREATE VIRTUAL TABLE emotions_fts USING fts5(
+        text,
+        user_id,
+        content='emotions',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''')
+    conn.execute("INSERT INTO emotions_fts (emotions_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')")
+    conn.execute('''
+    CREATE TRIGGER emotions_fts_insert AFTER INSERT ON emotions BEGIN
+        INSERT INTO emotions_fts (rowid, text, user_id) VALUES (new.id, new.text, new.user_id);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER emotions_fts_delete AFTER DELETE ON emotions BEGIN
+        INSERT INTO emotions_fts (emotions_fts, rowid, text, user_id) VALUES ('delete', old.id, old.text, old.user_id);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER emotions_fts_update AFTER UPDATE OF text, user_id ON emotions BEGIN
+        INSERT INTO emotions_fts (emotions_fts, rowid, text, user_id) VALUES ('delete', old.id, old.text, old.user_id);
+        INSERT INTO emotions_fts (rowid, text, user_id) VALUES (new.id, new.text, new.user_id);
+    END
+    ''')
+    conn.execute("INSERT INTO emotions_fts (emotions_fts) VALUES ('rebuild')")
+
+# Schema migrations, applied in order. The database's PRAGMA user_version
+# records how many have run, so never reorder or remove entries.
+MIGRATIONS = (
+    _migration_date_indexes,
+    _migration_daily_rollup,
+    _migration_term_index,
+    _migration_meta,
+    _migration_user_id,
+    _migration_fts,
+    _migration_rollup_id_range,
+    _migration_rollup_score_range,
+    _migration_content_hash,
+    _migration_fts_user_id,
+)
+
+def _migrate(conn):
+    """
+    Bring the schema up to date by running any pending migrations.
+    
+    Each migration runs in its own transaction together with the version bump.
+    
+    Args:
+        conn (sqlite3.Connection): An open connection
+    
+    Returns:
+        int: The schema version after migrating
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, len(MIGRATIONS) + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] < target:
+                MIGRATIONS[target - 1](conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(MIGRATIONS)
+
+def format_timestamp(value=None):
+    """
+    Convert a timestamp into the string format stored in the date column.
+    
+    Args:
+        value (datetime, date, str, int or float): The timestamp. Strings are
+            parsed as ISO 8601, numbers as Unix epoch seconds and None means now
+    
+    Returns:
+        str: Timestamp formatted as 'YYYY-MM-DD HH:MM:SS'
+    """
+    if value is None:
+        value = datetime.now()
+    elif isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    elif isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value)
+    elif not isinstance(value, datetime):
+        # A plain date: store it at midnight
+        value = datetime(value.year, value.month, value.day)
+    return value.strftime(DATE_FORMAT)
+
+def _normalize_content(text):
+    """Entry text with whitespace runs collapsed, as compared by deduplication."""
+    return " ".join(text.split())
+
+def _content_hash(date, text):
+    """
+    64-bit fingerprint of an entry's stored date and text, also registered as
+    the SQL function content_hash on every pooled connection.
+    """
+    digest = hashlib.sha1(f"{date}\x1f{_normalize_content(text)}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+def _entry_row(entry, user_id=DEFAULT_USER):
+    """
+    Turn a (text, sentiment, score[, date[, user_id]]) tuple or a dict into an
+    insert row, falling back to user_id when the entry does not name a journal.
+    """
+    if isinstance(entry, dict):
+        text = entry['text']
+        sentiment = entry['sentiment']
+        score = entry.get('sentiment_score', entry.get('score'))
+        date = entry.get('date')
+        user_id = entry.get('user_id') or user_id
+    else:
+        text, sentiment, score = entry[:3]
+        date = entry[3] if len(entry) > 3 else None
+        user_id = (entry[4] if len(entry) > 4 else None) or user_id
+    return (format_timestamp(date), text, sentiment, float(score), user_id)
+
+def _insert_rows(conn, rows):
+    """
+    Insert prepared (date, text, sentiment, sentiment_score, user_id) rows on
+    an open connection. The caller owns the transaction.
+    """
+    conn.executemany(
+        "INSERT INTO emotions (date, text, sentiment, sentiment_score, user_id, content_hash) "
+        "VALUES (?1, ?2, ?3, ?4, ?5, content_hash(?1, ?2))",
+        rows
     )
+    # The write lock is held, so the batch got consecutive ids ending here
+    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    _update_rollup(conn, rows, last_id - len(rows) + 1)
+    _update_term_index(conn, rows)
+    _bump_generation(conn, {row[4] for row in rows})
+
+def _generation_key(user_id):
+    """Key of a journal's generation counter in the meta table."""
+    return f"generation:{user_id}"
+
+def _bump_generation(conn, user_ids=None):
+    """
+    Record that the data changed, so caches keyed on the generation go stale.
+    
+    Args:
+        conn (sqlite3.Connection): Connection with an open transaction
+        user_ids (iterable of str): Journals that changed. None means all of them
+    """
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+    if user_ids is None:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key LIKE 'generation:%'")
+    else:
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            [(_generation_key(user_id),) for user_id in user_ids]
+        )
+
+@metrics.instrument("db.get_generation")
+def get_generation(user_id=None):
+    """
+    Get the data generation counter, which increases whenever entries change.
+    
+    The counter is read from SQLite on every call. It is a single primary key
+    lookup on a pooled connection, and unlike file timestamps it cannot miss
+    a commit.
+    
+    Args:
+        user_id (str): Journal whose entries are of interest. Writes to other
+            journals leave its generation unchanged. None counts every write
+    
+    Returns:
+        int: The current generation, or None if it could not be read
+    """
+    key = 'generation' if user_id is None else _generation_key(user_id)
+    try:
+        with get_connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+    except Exception as e:
+        metrics.increment("db.get_generation.errors")
+        print(f"Error reading data generation: {e}")
+        return None
+
+def _update_rollup(conn, rows, first_id):
+    """
+    Fold newly inserted (date, text, sentiment, sentiment_score, user_id) rows,
+    whose ids run consecutively from first_id, into daily_sentiment_rollup on
+    the caller's transaction.
+    """
+    days = {}
+    for entry_id, (date, _, sentiment, score, user_id) in enumerate(rows, first_id):
+        totals = days.setdefault((user_id, date[:10]), [0, 0, 0, 0, 0.0, 0.0, entry_id, entry_id, score, score])
+        if sentiment == "Positive":
+            totals[0] += 1
+        elif sentiment == "Negative":
+            totals[1] += 1
+        else:
+            totals[2] += 1
+        totals[3] += 1
+        totals[4] += score
+        totals[5] += score * score
+        totals[7] = entry_id
+        totals[8] = min(totals[8], score)
+        totals[9] = max(totals[9], score)
+    
+    conn.executemany(
+        """
+        INSERT INTO daily_sentiment_rollup
+            (user_id, day, positive_count, negative_count, neutral_count, score_count, score_sum, score_sq_sum,
+             min_id, max_id, score_min, score_max)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day) DO UPDATE SET
+            positive_count = positive_count + excluded.positive_count,
+            negative_count = negative_count + excluded.negative_count,
+            neutral_count = neutral_count + excluded.neutral_count,
+            score_count = score_count + excluded.score_count,
+            score_sum = score_sum + excluded.score_sum,
+            score_sq_sum = score_sq_sum + excluded.score_sq_sum,
+            min_id = MIN(min_id, excluded.min_id),
+            max_id = MAX(max_id, excluded.max_id),
+            score_min = MIN(score_min, excluded.score_min),
+            score_max = MAX(score_max, excluded.score_max)
+        """,
+        [key + tuple(totals) for key, totals in days.items()]
+    )
+
+def _rebuild_rollup(conn):
+    """Recompute daily_sentiment_rollup from the emotions table."""
+    conn.execute("DELETE FROM daily_sentiment_rollup")
+    conn.execute('''
+    INSERT INTO daily_sentiment_rollup
+        (user_id, day, positive_count, negative_count, neutral_count, score_count, score_sum, score_sq_sum,
+         min_id, max_id, score_min, score_max)
+    SELECT user_id,
+           substr(date, 1, 10),
+           SUM(sentiment = 'Positive'),
+           SUM(sentiment = 'Negative'),
+           SUM(sentiment NOT IN ('Positive', 'Negative')),
+           COUNT(*),
+           SUM(sentiment_score),
+           SUM(sentiment_score * sentiment_score),
+           MIN(id),
+           MAX(id),
+           MIN(sentiment_score),
+           MAX(sentiment_score)
+    FROM emotions
+    GROUP BY user_id, substr(date, 1, 10)
     ''')
+
+def _upsert_term_counts(conn, counts):
+    """Add {(user_id, day, term): count} increments to term_frequency."""
+    conn.executemany(
+        """
+        INSERT INTO term_frequency (user_id, day, term, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, day, term) DO UPDATE SET count = count + excluded.count
+        """,
+        [key + (count,) for key, count in counts.items()]
+    )
+
+def _update_term_index(conn, rows):
+    """
+    Fold the terms of newly inserted (date, text, sentiment, sentiment_score,
+    user_id) rows into term_frequency, on the caller's transaction.
+    """
+    counts = {}
+    for date, text, _, _, user_id in rows:
+        day = date[:10]
+        for term in tokenize(text):
+            key = (user_id, day, term)
+            counts[key] = counts.get(key, 0) + 1
+    _upsert_term_counts(conn, counts)
+
+def _rebuild_term_index(conn, chunk_size=5000):
+    """Recompute term_frequency by re-tokenizing the emotions table one journal day at a time."""
+    conn.execute("DELETE FROM term_frequency")
+    cursor = conn.execute("SELECT user_id, substr(date, 1, 10), text FROM emotions ORDER BY user_id, date")
+    group, texts = None, []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        for user_id, row_day, text in rows:
+            if (user_id, row_day) != group:
+                if texts:
+                    _upsert_term_counts(conn, {group + (term,): count for term, count in count_terms(texts).items()})
+                group, texts = (user_id, row_day), []
+            texts.append(text)
+        if not rows:
+            break
+    if texts:
+        _upsert_term_counts(conn, {group + (term,): count for term, count in count_terms(texts).items()})
+
+@metrics.instrument("db.rebuild_term_index")
+def rebuild_term_index():
+    """
+    Rebuild the word cloud's term frequency index from scratch.
     
-    conn.commit()
-    conn.close()
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        with get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            _rebuild_term_index(conn)
+            _bump_generation(conn)
+            conn.commit()
+        return True
+    except Exception as e:
+        metrics.increment("db.rebuild_term_index.errors")
+        print(f"Error rebuilding term index: {e}")
+        return False
+
+@metrics.instrument("db.rebuild_daily_rollup")
+def rebuild_daily_rollup():
+    """
+    Rebuild the daily sentiment rollup from scratch, e.g. after editing rows by hand.
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        with get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            _rebuild_rollup(conn)
+            _bump_generation(conn)
+            conn.commit()
+        return True
+    except Exception as e:
+        metrics.increment("db.rebuild_daily_rollup.errors")
+        print(f"Error rebuilding daily rollup: {e}")
+        return False
 
-def save_entry(text, sentiment, sentiment_score):
+@metrics.instrument("db.save_entry", log_query=True)
+def save_entry(text, sentiment, sentiment_score, date=None, user_id=DEFAULT_USER):
     """
     Save a new emotion entry to the database.
     
@@ -33,94 +668,701 @@ def save_entry(text, sentiment, sentiment_score):
         text (str): The text describing the emotion
         sentiment (str): The sentiment category (Positive, Negative, Neutral)
         sentiment_score (float): The sentiment polarity score
+        date (datetime, date, str or float): When the entry was written. Defaults to now
+        user_id (str): Journal the entry belongs to
     
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'emotions.db')
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get current timestamp
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = (format_timestamp(date), text, sentiment, sentiment_score, user_id)
         
-        # Insert new entry
-        cursor.execute(
-            "INSERT INTO emotions (date, text, sentiment, sentiment_score) VALUES (?, ?, ?, ?)",
-            (current_time, text, sentiment, sentiment_score)
-        )
-        
-        conn.commit()
-        conn.close()
+        with get_connection() as conn:
+            # Insert new entry
+            _insert_rows(conn, [row])
+            conn.commit()
         return True
     except Exception as e:
+        metrics.increment("db.save_entry.errors")
         print(f"Error saving entry: {e}")
         return False
 
-def get_all_entries():
+@metrics.instrument("db.save_entries", log_query=True)
+def save_entries(entries, batch_size=1000, user_id=DEFAULT_USER):
+    """
+    Save many emotion entries, committing once per batch instead of once per row.
+    
+    Args:
+        entries (iterable): (text, sentiment, sentiment_score, date, user_id) tuples
+            or dicts with the same keys; date may be omitted to use the current
+            time and user_id to use the user_id argument
+        batch_size (int): Number of rows inserted per transaction
+        user_id (str): Journal of the entries that do not name one
+    
+    Returns:
+        int: Number of rows inserted. On error, the rows committed before the
+            failing batch
+    """
+    inserted = 0
+    try:
+        with get_connection() as conn:
+            batch = []
+            for entry in entries:
+                batch.append(_entry_row(entry, user_id))
+                if len(batch) >= batch_size:
+                    inserted += _commit_batch(conn, batch)
+                    batch = []
+            if batch:
+                inserted += _commit_batch(conn, batch)
+        return inserted
+    except Exception as e:
+        metrics.increment("db.save_entries.errors")
+        print(f"Error saving entries: {e}")
+        return inserted
+
+def _commit_batch(conn, rows):
+    """Insert one batch of rows inside an explicit transaction."""
+    conn.execute("BEGIN")
+    try:
+        _insert_rows(conn, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+def _new_rows(conn, rows):
+    """
+    Drop prepared rows whose date and text are already in their journal, or
+    earlier in rows. Candidates are found by content_hash and confirmed by
+    comparing the date and text themselves.
+    """
+    existing = set()
+    by_user = {}
+    for date, text, _, _, user_id in rows:
+        by_user.setdefault(user_id, set()).add(_content_hash(date, text))
+    for user_id, hashes in by_user.items():
+        found = conn.execute(
+            "SELECT date, text FROM emotions WHERE user_id = ? AND content_hash IN (SELECT value FROM json_each(?))",
+            (user_id, json.dumps(sorted(hashes)))
+        )
+        existing.update((user_id, date, _normalize_content(text)) for date, text in found)
+    
+    new_rows = []
+    for row in rows:
+        key = (row[4], row[0], _normalize_content(row[1]))
+        if key not in existing:
+            existing.add(key)
+            new_rows.append(row)
+    return new_rows
+
+@metrics.instrument("db.save_new_entries")
+def save_new_entries(entries, user_id=DEFAULT_USER):
+    """
+    Save one batch of entries in a single transaction, skipping entries whose
+    date and text are already in their journal (or repeated in the batch).
+    
+    Unlike save_entries, errors are raised rather than reported, so callers
+    such as the importer know the batch was not saved.
+    
+    Args:
+        entries (iterable): Entries in any form save_entries accepts
+        user_id (str): Journal of the entries that do not name one
+    
+    Returns:
+        int: Number of entries inserted; the rest were duplicates
+    
+    Raises:
+        sqlite3.Error: When the batch could not be saved. Nothing is committed then
+    """
+    rows = [_entry_row(entry, user_id) for entry in entries]
+    with get_connection() as conn:
+        # Take the write lock before looking for duplicates, so that no other
+        # writer can add one in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = _new_rows(conn, rows)
+            if rows:
+                _insert_rows(conn, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(rows)
+
+@metrics.instrument("db.get_all_entries", log_query=True)
+def get_all_entries(user_id=DEFAULT_USER):
     """
-    Retrieve all entries from the database.
+    Retrieve all entries of a journal from the database.
+    
+    Args:
+        user_id (str): Journal to read
     
     Returns:
         pandas.DataFrame: DataFrame containing all entries
     """
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'emotions.db')
-        conn = sqlite3.connect(db_path)
-        query = "SELECT * FROM emotions ORDER BY date DESC"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        query = f"SELECT {ENTRY_COLUMNS_SQL} FROM emotions WHERE user_id = ? ORDER BY date DESC"
+        with get_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(user_id,))
         return df
     except Exception as e:
+        metrics.increment("db.get_all_entries.errors")
         print(f"Error retrieving entries: {e}")
         return None
 
-def get_entries_by_date_range(start_date, end_date):
+@metrics.instrument("db.get_entries_by_date_range", log_query=True)
+def get_entries_by_date_range(start_date, end_date, user_id=DEFAULT_USER):
     """
     Retrieve entries within a specific date range.
     
     Args:
         start_date (datetime.date): Start date for filtering
         end_date (datetime.date): End date for filtering
+        user_id (str): Journal to read
     
     Returns:
         pandas.DataFrame: DataFrame containing filtered entries
     """
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'emotions.db')
-        conn = sqlite3.connect(db_path)
-        
         # Convert dates to strings in the format expected by SQLite
         start_date_str = start_date.strftime('%Y-%m-%d 00:00:00')
         end_date_str = end_date.strftime('%Y-%m-%d 23:59:59')
         
-        query = """
-        SELECT * FROM emotions 
-        WHERE date BETWEEN ? AND ?
+        query = f"""
+        SELECT {ENTRY_COLUMNS_SQL} FROM emotions 
+        WHERE user_id = ? AND date BETWEEN ? AND ?
         ORDER BY date DESC
         """
         
-        df = pd.read_sql_query(query, conn, params=(start_date_str, end_date_str))
-        conn.close()
+        with get_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(user_id, start_date_str, end_date_str))
         return df
     except Exception as e:
+        metrics.increment("db.get_entries_by_date_range.errors")
         print(f"Error retrieving entries by date range: {e}")
         return None
 
-def backup_to_csv():
+@metrics.instrument("db.get_entries_page", log_query=True, count_rows=lambda page: len(page[0]))
+def get_entries_page(start_date=None, end_date=None, limit=20, before=None, sentiment=None, user_id=DEFAULT_USER):
+    """
+    Retrieve one page of a journal's entries, newest first, by keyset pagination.
+    
+    Each page continues from a (date, id) cursor rather than an OFFSET, so a
+    page is read directly from the (user_id, date) index. Deep pages cost the
+    same as the first, and a page is never loaded together with the rest of
+    the range.
+    
+    Args:
+        start_date (datetime.date): Optional start date for filtering
+        end_date (datetime.date): Optional end date for filtering
+        limit (int): Maximum number of entries on the page
+        before (tuple): (date, id) cursor returned with the previous page, or
+            None for the first page
+        sentiment (str): Optional sentiment category to keep, e.g. 'Positive'
+        user_id (str): Journal to read
+    
+    Returns:
+        tuple: (pandas.DataFrame of up to limit entries, cursor of the next
+            page or None on the last page), or None on error
+    """
+    try:
+        query = f"SELECT {ENTRY_COLUMNS_SQL} FROM emotions WHERE user_id = ?"
+        params = [user_id]
+        if start_date is not None:
+            query += " AND date >= ?"
+            params.append(start_date.strftime('%Y-%m-%d 00:00:00'))
+        # A single upper date bound, so the index scan starts at the cursor
+        # rather than at the end of the range
+        upper = end_date.strftime('%Y-%m-%d 23:59:59') if end_date is not None else None
+        if before is not None:
+            upper = before[0] if upper is None else min(upper, before[0])
+        if upper is not None:
+            query += " AND date <= ?"
+            params.append(upper)
+        if before is not None:
+            query += " AND (date < ? OR id < ?)"
+            params.extend((before[0], before[1]))
+        if sentiment:
+            query += " AND sentiment = ?"
+            params.append(sentiment)
+        # One extra row tells whether another page follows
+        query += " ORDER BY date DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        with get_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        if len(df) <= limit:
+            return df, None
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        return df, (last['date'], int(last['id']))
+    except Exception as e:
+        metrics.increment("db.get_entries_page.errors")
+        print(f"Error retrieving entries page: {e}")
+        return None
+
+def _entries_query(start_date=None, end_date=None, columns=None, user_id=DEFAULT_USER):
+    """Build the SELECT for a journal's optionally date-bounded, column-filtered read."""
+    columns = tuple(columns) if columns else ENTRY_COLUMNS
+    unknown = [column for column in columns if column not in ENTRY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown entry columns: {', '.join(unknown)}")
+    
+    query = f"SELECT {', '.join(columns)} FROM emotions WHERE user_id = ?"
+    params = [user_id]
+    if start_date is not None:
+        query += " AND date >= ?"
+        params.append(start_date.strftime('%Y-%m-%d 00:00:00'))
+    if end_date is not None:
+        query += " AND date <= ?"
+        params.append(end_date.strftime('%Y-%m-%d 23:59:59'))
+    query += " ORDER BY date DESC"
+    return query, params, columns
+
+def iter_entry_rows(start_date=None, end_date=None, columns=None, chunk_size=1000, user_id=DEFAULT_USER):
+    """
+    Stream entries one row at a time, newest first, without loading the table.
+    
+    Args:
+        start_date (datetime.date): Optional start date for filtering
+        end_date (datetime.date): Optional end date for filtering
+        columns (iterable of str): Columns to fetch. Defaults to ENTRY_COLUMNS
+        chunk_size (int): Number of rows fetched from SQLite at a time
+        user_id (str): Journal to read
+    
+    Yields:
+        tuple: One row with the requested columns, in order
+    """
+    query, params, _ = _entries_query(start_date, end_date, columns, user_id)
+    with get_connection() as conn:
+        cursor = conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+def iter_entries(start_date=None, end_date=None, columns=None, chunk_size=1000, user_id=DEFAULT_USER):
+    """
+    Stream entries as DataFrame chunks, newest first, so peak memory is bounded
+    by chunk_size rather than by the size of the table.
+    
+    Args:
+        start_date (datetime.date): Optional start date for filtering
+        end_date (datetime.date): Optional end date for filtering
+        columns (iterable of str): Columns to fetch. Defaults to ENTRY_COLUMNS
+        chunk_size (int): Maximum number of rows per chunk
+        user_id (str): Journal to read
+    
+    Yields:
+        pandas.DataFrame: Up to chunk_size entries
+    """
+    query, params, columns = _entries_query(start_date, end_date, columns, user_id)
+    with get_connection() as conn:
+        cursor = conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=list(columns))
+        finally:
+            cursor.close()
+
+@metrics.instrument("db.get_date_bounds", log_query=True)
+def get_date_bounds(user_id=DEFAULT_USER):
+    """
+    Get the dates of a journal's earliest and latest entries.
+    
+    Each bound is a separate MIN/MAX subquery so SQLite answers both with a
+    single lookup at either end of the journal's range of the (user_id, date)
+    index.
+    
+    Args:
+        user_id (str): Journal to read
+    
+    Returns:
+        tuple: (min_date, max_date) as datetime.date objects, (None, None) when
+            the table is empty, or None on error
+    """
+    try:
+        query = (
+            "SELECT (SELECT MIN(date) FROM emotions WHERE user_id = ?1), "
+            "(SELECT MAX(date) FROM emotions WHERE user_id = ?1)"
+        )
+        with get_connection() as conn:
+            min_date, max_date = conn.execute(query, (user_id,)).fetchone()
+        if min_date is None:
+            return None, None
+        return (
+            datetime.strptime(min_date[:10], '%Y-%m-%d').date(),
+            datetime.strptime(max_date[:10], '%Y-%m-%d').date(),
+        )
+    except Exception as e:
+        metrics.increment("db.get_date_bounds.errors")
+        print(f"Error retrieving date bounds: {e}")
+        return None
+
+@metrics.instrument("db.get_daily_rollup", log_query=True)
+def get_daily_rollup(start_date, end_date, user_id=DEFAULT_USER):
+    """
+    Retrieve per-day sentiment totals within a date range.
+    
+    Args:
+        start_date (datetime.date): Start date for filtering
+        end_date (datetime.date): End date for filtering
+        user_id (str): Journal to read
+    
+    Returns:
+        pandas.DataFrame: One row per day with the per-category counts, score
+            count, sum and sum of squares, plus the mean sentiment_score
+    """
+    try:
+        query = """
+        SELECT day, positive_count, negative_count, neutral_count,
+               score_count, score_sum, score_sq_sum,
+               score_sum / score_count AS sentiment_score
+        FROM daily_sentiment_rollup
+        WHERE user_id = ? AND day BETWEEN ? AND ?
+        ORDER BY day
+        """
+        params = (user_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        with get_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        return df
+    except Exception as e:
+        metrics.increment("db.get_daily_rollup.errors")
+        print(f"Error retrieving daily rollup: {e}")
+        return None
+
+def choose_resolution(first_day, last_day, max_points=SERIES_MAX_POINTS):
+    """
+    Pick the finest time series resolution that keeps a span within a point budget.
+    
+    Args:
+        first_day (datetime.date): First day with data
+        last_day (datetime.date): Last day with data
+        max_points (int): Most buckets allowed
+    
+    Returns:
+        str: One of SERIES_RESOLUTIONS
+    """
+    days = (last_day - first_day).days + 1
+    buckets = {
+        'day': days,
+        'week': days / 7 + 1,
+        'month': (last_day.year - first_day.year) * 12 + last_day.month - first_day.month + 1,
+    }
+    for resolution, count in buckets.items():
+        if count <= max_points:
+            return resolution
+    return 'year'
+
+@metrics.instrument("db.get_sentiment_series", log_query=True, count_rows=lambda series: len(series[1]))
+def get_sentiment_series(start_date, end_date, resolution='auto', max_points=SERIES_MAX_POINTS, user_id=DEFAULT_USER):
+    """
+    Aggregate the daily rollup into a sentiment time series.
+    
+    Buckets are computed in SQL from the rollup, so the cost follows the
+    number of days rather than entries, and at most one row per bucket leaves
+    the database. With resolution 'auto', the finest resolution that fits
+    max_points is picked from the days that actually have data.
+    
+    Args:
+        start_date (datetime.date): Start date for filtering
+        end_date (datetime.date): End date for filtering
+        resolution (str): 'auto' or one of SERIES_RESOLUTIONS
+        max_points (int): Point budget used by 'auto'
+        user_id (str): Journal to read
+    
+    Returns:
+        tuple: (resolution, pandas.DataFrame) with one row per bucket holding
+            bucket (first day, YYYY-MM-DD), entries, mean_score, score_min,
+            score_max and rolling_mean (entry-weighted over the calendar
+            buckets ending at this one, e.g. the last 7 days, empty ones
+            included), or None on error
+    """
+    try:
+        params = (user_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        with get_connection() as conn:
+            if resolution == 'auto':
+                first_day, last_day = conn.execute(
+                    "SELECT MIN(day), MAX(day) FROM daily_sentiment_rollup WHERE user_id = ? AND day BETWEEN ? AND ?",
+                    params
+                ).fetchone()
+                resolution = 'day'
+                if first_day is not None:
+                    resolution = choose_resolution(
+                        datetime.strptime(first_day, '%Y-%m-%d').date(),
+                        datetime.strptime(last_day, '%Y-%m-%d').date(),
+                        max_points
+                    )
+            bucket, window, position = SERIES_RESOLUTIONS[resolution]
+            
+            query = f"""
+            WITH buckets AS (
+                SELECT {bucket} AS bucket,
+                       SUM(score_count) AS entries,
+                       SUM(score_sum) AS score_sum,
+                       MIN(score_min) AS score_min,
+                       MAX(score_max) AS score_max
+                FROM daily_sentiment_rollup
+                WHERE user_id = ? AND day BETWEEN ? AND ?
+                GROUP BY 1
+            )
+            SELECT bucket, entries, score_sum / entries AS mean_score, score_min, score_max,
+                   SUM(score_sum) OVER recent / SUM(entries) OVER recent AS rolling_mean
+            FROM buckets
+            WINDOW recent AS (ORDER BY {position} RANGE BETWEEN {window - 1} PRECEDING AND CURRENT ROW)
+            ORDER BY bucket
+            """
+            df = pd.read_sql_query(query, conn, params=params)
+        return resolution, df
+    except Exception as e:
+        metrics.increment("db.get_sentiment_series.errors")
+        print(f"Error retrieving sentiment series: {e}")
+        return None
+
+def write_entries_csv(file, start_date=None, end_date=None, columns=None, chunk_size=5000, user_id=DEFAULT_USER):
+    """
+    Write entries to an open text file as CSV, one chunk at a time.
+    
+    Args:
+        file: A writable text file object
+        start_date (datetime.date): Optional start date for filtering
+        end_date (datetime.date): Optional end date for filtering
+        columns (iterable of str): Columns to export. Defaults to ENTRY_COLUMNS
+        chunk_size (int): Number of rows held in memory at a time
+        user_id (str): Journal to export
+    
+    Returns:
+        int: Number of rows written
+    """
+    written = 0
+    for chunk in iter_entries(start_date, end_date, columns, chunk_size, user_id):
+        chunk.to_csv(file, index=False, header=(written == 0))
+        written += len(chunk)
+    return written
+
+@metrics.instrument("db.get_term_frequencies", log_query=True)
+def get_term_frequencies(start_date, end_date, limit=100, user_id=DEFAULT_USER):
     """
-    Backup the database to a CSV file.
+    Retrieve the most frequent word cloud terms within a date range.
+    
+    Args:
+        start_date (datetime.date): Start date for filtering
+        end_date (datetime.date): End date for filtering
+        limit (int): Maximum number of terms to return
+        user_id (str): Journal to read
+    
+    Returns:
+        dict: Mapping of term to count, most frequent first
+    """
+    try:
+        query = """
+        SELECT term, SUM(count) AS total
+        FROM term_frequency
+        WHERE user_id = ? AND day BETWEEN ? AND ?
+        GROUP BY term
+        ORDER BY total DESC, term
+        LIMIT ?
+        """
+        params = (user_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), limit)
+        with get_connection() as conn:
+            return dict(conn.execute(query, params).fetchall())
+    except Exception as e:
+        metrics.increment("db.get_term_frequencies.errors")
+        print(f"Error retrieving term frequencies: {e}")
+        return None
+
+def _fts_query(query):
+    """
+    Turn free text into an FTS5 query matching entries that contain every word.
+    
+    Words are quoted so punctuation and FTS keywords (AND, OR, NEAR) in user
+    input are searched for literally; a trailing * keeps its prefix meaning.
+    
+    Args:
+        query (str): Search text as typed by the user
+    
+    Returns:
+        str: The MATCH expression, or None when the text has no words
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return " ".join(terms) or None
+
+def _fts_journal_query(match, user_id=None):
+    """
+    Restrict an FTS5 query to the text column, and optionally to one journal.
+    
+    The journal clause matches its user_id as a phrase of tokens, so it can
+    also match journals whose ids contain that phrase; callers still compare
+    user_id exactly. An id without any letters or digits has no tokens to
+    match, and is left to that exact comparison alone.
+    
+    Args:
+        match (str): Expression built by _fts_query
+        user_id (str): Journal to search, or None for every journal
+    
+    Returns:
+        str: The MATCH expression
+    """
+    if user_id is None or not any(ch.isalnum() for ch in user_id):
+        return f"text : ({match})"
+    journal = user_id.replace('"', '""')
+    return f'user_id : "{journal}" AND text : ({match})'
+
+@metrics.instrument("db.search_entries", log_query=True)
+def search_entries(query, start_date=None, end_date=None, sentiment=None, limit=20, offset=0, user_id=DEFAULT_USER):
+    """
+    Full-text search over a journal's entries, best matches first.
+    
+    Search runs in two steps so its cost stays bounded however common the words
+    are. The newest SEARCH_CANDIDATES matching entries that pass the filters
+    are found by walking the emotions_fts index backwards, starting inside the
+    journal's range of ids for the dates, which the daily rollup records. When
+    the journal holds less than SEARCH_JOURNAL_SHARE of those ids, the index's
+    journal column narrows the walk to its own matches, however many entries
+    of other journals share the range. BM25 then ranks those entries; BM25 is
+    the expensive part. When fewer entries
+    match, the ranking is exact over all of them.
+    
+    Args:
+        query (str): Words to search for; every word must appear. End a word
+            with * to match it as a prefix
+        start_date (datetime.date): Optional start date for filtering
+        end_date (datetime.date): Optional end date for filtering
+        sentiment (str): Optional sentiment category to keep, e.g. 'Positive'
+        limit (int): Maximum number of results
+        offset (int): Number of best results to skip, for paging
+        user_id (str): Journal to search
+    
+    Returns:
+        pandas.DataFrame: Matching entries with ENTRY_COLUMNS plus a 'rank'
+            column (lower is better), or None on error
+    """
+    try:
+        match = _fts_query(query or '')
+        if match is None:
+            return pd.DataFrame(columns=list(ENTRY_COLUMNS) + ['rank'])
+        
+        # CROSS JOIN keeps the FTS index as the outer loop; otherwise SQLite may
+        # walk the (user_id, date) index and run one full-text match per entry
+        filters = "e.user_id = ?"
+        params = [user_id]
+        if start_date is not None:
+            filters += " AND e.date >= ?"
+            params.append(start_date.strftime('%Y-%m-%d 00:00:00'))
+        if end_date is not None:
+            filters += " AND e.date <= ?"
+            params.append(end_date.strftime('%Y-%m-%d 23:59:59'))
+        if sentiment:
+            filters += " AND e.sentiment = ?"
+            params.append(sentiment)
+        
+        first_day = start_date.strftime('%Y-%m-%d') if start_date is not None else '0000-00-00'
+        last_day = end_date.strftime('%Y-%m-%d') if end_date is not None else '9999-99-99'
+        with get_connection() as conn:
+            low_id, high_id, journal_entries = conn.execute(
+                "SELECT MIN(min_id), MAX(max_id), SUM(score_count) FROM daily_sentiment_rollup "
+                "WHERE user_id = ? AND day BETWEEN ? AND ?",
+                (user_id, first_day, last_day)
+            ).fetchone()
+            if low_id is None:
+                return pd.DataFrame(columns=list(ENTRY_COLUMNS) + ['rank'])
+            
+            # Only a small journal gains from intersecting with its own
+            # posting list; a large one makes up most matches anyway
+            small = journal_entries < SEARCH_JOURNAL_SHARE * (high_id - low_id + 1)
+            match = _fts_journal_query(match, user_id if small else None)
+            
+            oldest = conn.execute(f"""
+            SELECT MIN(id) FROM (
+                SELECT emotions_fts.rowid AS id
+                FROM emotions_fts CROSS JOIN emotions e ON e.id = emotions_fts.rowid
+                WHERE emotions_fts MATCH ? AND emotions_fts.rowid BETWEEN ? AND ? AND {filters}
+                ORDER BY emotions_fts.rowid DESC
+                LIMIT ?
+            )
+            """, [match, low_id, high_id] + params + [SEARCH_CANDIDATES]).fetchone()[0]
+            if oldest is None:
+                return pd.DataFrame(columns=list(ENTRY_COLUMNS) + ['rank'])
+            
+            columns = ", ".join(f"e.{column}" for column in ENTRY_COLUMNS)
+            df = pd.read_sql_query(f"""
+            SELECT {columns}, emotions_fts.rank AS rank
+            FROM emotions_fts CROSS JOIN emotions e ON e.id = emotions_fts.rowid
+            WHERE emotions_fts MATCH ? AND emotions_fts.rowid BETWEEN ? AND ? AND {filters}
+            ORDER BY emotions_fts.rank, e.date DESC, e.id DESC
+            LIMIT ? OFFSET ?
+            """, conn, params=[match, oldest, high_id] + params + [limit, offset])
+        return df
+    except Exception as e:
+        metrics.increment("db.search_entries.errors")
+        print(f"Error searching entries: {e}")
+        return None
+
+@metrics.instrument("db.get_users", log_query=True)
+def get_users():
+    """
+    List the journals that have entries.
+    
+    Returns:
+        list: User ids in alphabetical order, or None on error
+    """
+    try:
+        # The rollup holds one row per journal day, far fewer than entries
+        with get_connection() as conn:
+            rows = conn.execute("SELECT DISTINCT user_id FROM daily_sentiment_rollup ORDER BY user_id").fetchall()
+        return [user_id for (user_id,) in rows]
+    except Exception as e:
+        metrics.increment("db.get_users.errors")
+        print(f"Error retrieving users: {e}")
+        return None
+
+def backup_to_csv(path='emotions_backup.csv', chunk_size=5000, user_id=DEFAULT_USER):
+    """
+    Backup a journal to a CSV file, streaming it chunk by chunk.
+    
+    Args:
+        path (str): Destination file
+        chunk_size (int): Number of rows held in memory at a time
+        user_id (str): Journal to back up
     
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        df = get_all_entries()
-        if df is not None and not df.empty:
-            df.to_csv('emotions_backup.csv', index=False)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            written = write_entries_csv(f, chunk_size=chunk_size, user_id=user_id)
+        if written:
             return True
+        os.remove(path)
         return False
     except Exception as e:
         print(f"Error backing up to CSV: {e}")
         return False
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Emotions database maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("rebuild-rollup", help="Recompute the daily sentiment rollup table")
+    subcommands.add_parser("rebuild-terms", help="Recompute the word cloud term frequency index")
+    args = parser.parse_args()
+    
+    initialize_db()
+    if args.command == "rebuild-rollup":
+        print("Daily rollup rebuilt" if rebuild_daily_rollup() else "Daily rollup rebuild failed")
+    elif args.command == "rebuild-terms":
+        print("Term index rebuilt" if rebuild_term_index() else "Term index rebuild failed")
@@ -0,0 +1,123 @@
+import argparse
+import gzip
+import importlib.util
+import io
+from datetime import date
+
+from database import DEFAULT_USER, ENTRY_COLUMNS, initialize_db, iter_entries, write_entries_csv
+
+# Export formats, keyed by the file extension they are written with
+FORMATS = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Column types for Parquet output, so every chunk shares one schema
+PARQUET_TYPES = {
+    "id": "int64",
+    "date": "string",
+    "text": "string",
+    "sentiment": "string",
+    "sentiment_score": "float64",
+}
+
+def available_formats():
+    """
+    List the export formats usable in this environment.
+
+    Returns:
+        list: Format names; 'parquet' is only included when pyarrow is installed
+    """
+    return [fmt for fmt in FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow")]
+
+def infer_format(path):
+    """
+    Guess the export format from a file name.
+
+    Args:
+        path (str): Destination file name
+
+    Returns:
+        str: One of FORMATS, defaulting to 'csv'
+    """
+    for fmt in sorted(FORMATS, key=len, reverse=True):
+        if path.lower().endswith("." + fmt):
+            return fmt
+    return "csv"
+
+def export_entries(target, fmt=None, start_date=None, end_date=None, columns=None, chunk_size=5000, user_id=DEFAULT_USER):
+    """
+    Export a journal's entries without holding the whole table in memory.
+
+    Args:
+        target (str or binary file object): Destination path or writable binary file
+        fmt (str): 'csv', 'csv.gz' or 'parquet'. Inferred from the path when omitted
+        start_date (datetime.date): Optional start date for filtering
+        end_date (datetime.date): Optional end date for filtering
+        columns (iterable of str): Columns to export. Defaults to all entry columns
+        chunk_size (int): Number of rows held in memory at a time
+        user_id (str): Journal to export
+
+    Returns:
+        int: Number of rows written
+    """
+    if fmt is None:
+        fmt = infer_format(target) if isinstance(target, str) else "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    columns = list(columns) if columns else list(ENTRY_COLUMNS)
+
+    if fmt == "parquet":
+        return _export_parquet(target, start_date, end_date, columns, chunk_size, user_id)
+
+    owns_file = isinstance(target, str)
+    raw = open(target, "wb") if owns_file else target
+    try:
+        binary = gzip.GzipFile(fileobj=raw, mode="wb") if fmt == "csv.gz" else raw
+        text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        written = write_entries_csv(text, start_date, end_date, columns, chunk_size, user_id)
+        text.flush()
+        # Detach so closing the wrapper doesn't close a caller-owned file
+        text.detach()
+        if binary is not raw:
+            binary.close()
+        return written
+    finally:
+        if owns_file:
+            raw.close()
+
+def _export_parquet(target, start_date, end_date, columns, chunk_size, user_id):
+    """Write entries to Parquet, one row group per chunk."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(column, PARQUET_TYPES[column]) for column in columns])
+    written = 0
+    with pq.ParquetWriter(target, schema) as writer:
+        for chunk in iter_entries(start_date, end_date, columns, chunk_size, user_id):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            written += len(chunk)
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export emotion entries to CSV, gzip-compressed CSV or Parquet")
+    parser.add_argument("output", help="Destination file, e.g. emotions.csv, emotions.csv.gz or emotions.parquet")
+    parser.add_argument("--format", choices=list(FORMATS), help="Output format (default: inferred from the file name)")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--columns", help=f"Comma-separated columns to export (default: {','.join(ENTRY_COLUMNS)})")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows held in memory at a time")
+    parser.add_argument("--user", default=DEFAULT_USER, help="Journal to export")
+    args = parser.parse_args(argv)
+
+    initialize_db()
+    columns = args.columns.split(",") if args.columns else None
+    written = export_entries(args.output, args.format, args.start, args.end, columns, args.chunk_size, args.user)
+    print(f"Exported {written} entries to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+
+from database import DEFAULT_USER, format_timestamp, initialize_db, save_new_entries
+from sentiment import ANALYZERS, analyze_sentiments
+
+# Input formats by file extension; anything else is read as plain text
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".txt": "txt"}
+
+# Entries scored and committed together. Each batch is one transaction and one
+# checkpoint, so this is also the most work redone after an interruption
+DEFAULT_BATCH_SIZE = 2000
+
+# A plain-text line that starts with an ISO date or timestamp, optionally
+# followed by a separator and the entry text
+TIMESTAMP_LINE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?)\s*(?:[-|:]\s+)?(.*)$"
+)
+
+def detect_format(path):
+    """
+    Guess the format of a journal dump from its extension.
+
+    Args:
+        path (str): Path of the dump
+
+    Returns:
+        str: 'csv', 'jsonl' or 'txt'
+    """
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "txt")
+
+def default_checkpoint_path(path):
+    """Checkpoint file used for a dump unless another one is given."""
+    return path + ".import-checkpoint.json"
+
+def _load_checkpoint(checkpoint, path, fmt):
+    """The saved progress of importing path, or None when there is none to resume."""
+    try:
+        with open(checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get("path") != os.path.abspath(path) or state.get("format") != fmt:
+        return None
+    # A dump that shrank is not the one the checkpoint was taken on
+    if state.get("offset", 0) > os.path.getsize(path):
+        return None
+    return state
+
+def _save_checkpoint(checkpoint, state):
+    """Write the checkpoint atomically, so an interruption never leaves half of one."""
+    temporary = checkpoint + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temporary, checkpoint)
+
+def _lines(f, position):
+    """Yield decoded lines of a binary file, keeping position[0] at the end of the last one."""
+    for raw in f:
+        position[0] += len(raw)
+        yield raw.decode("utf-8-sig", errors="replace")
+
+def _date_value(value):
+    """Turn a date field into something format_timestamp accepts; '' and None mean no date."""
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+def _records(f, fmt, state, position, text_field, date_field, header):
+    """
+    Yield (line number, text, date) for every record after the current
+    position. Dates are None when the record has none, and records that
+    cannot be read come back with text None.
+    """
+    line_number = state["line"]
+
+    if fmt == "txt":
+        for line in _lines(f, position):
+            line_number += 1
+            state["line"] = line_number
+            line = line.strip()
+            if not line:
+                continue
+            match = TIMESTAMP_LINE.match(line)
+            if match is None:
+                yield line_number, line, state.get("heading")
+            elif match.group(2):
+                yield line_number, match.group(2), match.group(1)
+            else:
+                # A date on its own line dates the lines under it
+                state["heading"] = match.group(1)
+        return
+
+    if fmt == "jsonl":
+        for line in _lines(f, position):
+            line_number += 1
+            state["line"] = line_number
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                yield line_number, None, None
+                continue
+            text = record.get(text_field)
+            yield line_number, text if isinstance(text, str) else None, _date_value(record.get(date_field))
+        return
+
+    # The csv module reads lines one at a time, so after each row the position
+    # is the end of that row, even when quoted fields span lines
+    reader = csv.reader(_lines(f, position))
+    for row in reader:
+        state["line"] = reader.line_num + line_number
+        if not row:
+            continue
+        record = dict(zip(header, row))
+        yield state["line"], record.get(text_field), _date_value(record.get(date_field))
+
+def _read_header(path):
+    """Column names of a CSV dump and the byte offset of its first record."""
+    with open(path, "rb") as f:
+        first = f.readline()
+    header = next(csv.reader([first.decode("utf-8-sig", errors="replace")]), [])
+    return [name.strip() for name in header], len(first)
+
+def _report(stream, state, size, started, resumed_records):
+    """Write one progress line: share of the file done, counts and throughput."""
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    done = state["offset"] / size * 100 if size else 100.0
+    rate = (state["records"] - resumed_records) / elapsed
+    stream.write(
+        f"\r{done:5.1f}%  {state['records']:,} read  {state['inserted']:,} new  "
+        f"{state['duplicates']:,} duplicates  {state['invalid']:,} invalid  {rate:,.0f} entries/s"
+    )
+    stream.flush()
+
+def import_file(path, fmt=None, user_id=DEFAULT_USER, text_field="text", date_field="date",
+                batch_size=DEFAULT_BATCH_SIZE, workers=None, backend=None, checkpoint=None,
+                restart=False, progress=None):
+    """
+    Import a journal dump into the emotions table.
+
+    The dump is streamed rather than loaded, scored a batch at a time on a
+    process pool, and each batch is saved in one transaction. Entries keep the
+    timestamps of the dump; plain-text entries without one take the date of
+    the nearest date line above them, or the file's modification time. Entries
+    whose date and text are already in the journal are skipped, so importing
+    a dump twice adds nothing.
+
+    After every batch, the byte offset reached is saved to a checkpoint file,
+    and an interrupted import resumes from there when run again. A batch that
+    was committed just before an interruption is skipped as duplicates on
+    resume. The checkpoint is removed once the import completes.
+
+    Args:
+        path (str): The dump
+        fmt (str): 'txt' (one entry per line), 'csv' (with a header row) or
+            'jsonl' (one object per line). Defaults to detect_format(path)
+        user_id (str): Journal the entries are added to
+        text_field (str): CSV column or JSON key holding the entry text
+        date_field (str): CSV column or JSON key holding the timestamp, as
+            ISO 8601 or Unix epoch seconds
+        batch_size (int): Entries scored and committed together
+        workers (int): Scoring processes. Defaults to one per CPU
+        backend (str): Optional sentiment backend, one of sentiment.ANALYZERS
+        checkpoint (str): Checkpoint file. Defaults to default_checkpoint_path(path)
+        restart (bool): Ignore any checkpoint and read the dump from the start
+        progress (file): Stream to write progress lines to, e.g. sys.stderr
+
+    Returns:
+        dict: Counts of records read, entries inserted, duplicates skipped and
+            invalid records, plus seconds taken and entries read per second
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in ("txt", "csv", "jsonl"):
+        raise ValueError(f"Unknown format: {fmt} (choose from txt, csv, jsonl)")
+    checkpoint = checkpoint or default_checkpoint_path(path)
+    workers = workers or os.cpu_count() or 1
+
+    header = None
+    start = 0
+    if fmt == "csv":
+        header, start = _read_header(path)
+        if text_field not in header:
+            raise ValueError(f"CSV has no '{text_field}' column")
+
+    state = None if restart else _load_checkpoint(checkpoint, path, fmt)
+    if state is None:
+        state = {
+            "path": os.path.abspath(path), "format": fmt, "offset": start, "line": 1 if header else 0,
+            "records": 0, "inserted": 0, "duplicates": 0, "invalid": 0,
+        }
+    elif progress is not None:
+        progress.write(f"Resuming after {state['records']:,} records (line {state['line']:,})\n")
+
+    initialize_db()
+    # Entries without a date of their own fall back to the dump's modification time
+    fallback_date = format_timestamp(os.path.getmtime(path))
+    size = os.path.getsize(path)
+    resumed_records = state["records"]
+    started = time.perf_counter()
+
+    executor = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    def commit(batch, offset):
+        results = analyze_sentiments([text for text, _ in batch], workers=workers, backend=backend, executor=executor)
+        entries = [
+            (text, category, score, date, user_id)
+            for (text, date), (category, score) in zip(batch, results)
+        ]
+        inserted = save_new_entries(entries, user_id=user_id)
+        state["inserted"] += inserted
+        state["duplicates"] += len(entries) - inserted
+        state["offset"] = offset
+        _save_checkpoint(checkpoint, state)
+        if progress is not None:
+            _report(progress, state, size, started, resumed_records)
+
+    try:
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            position = [state["offset"]]
+            batch = []
+            for line_number, text, date in _records(f, fmt, state, position, text_field, date_field, header):
+                state["records"] += 1
+                try:
+                    if text is None or not text.strip():
+                        raise ValueError("no entry text")
+                    batch.append((text.strip(), format_timestamp(date if date is not None else fallback_date)))
+                except (ValueError, TypeError, OverflowError, OSError) as e:
+                    state["invalid"] += 1
+                    if progress is not None:
+                        progress.write(f"\nSkipping line {line_number}: {e}\n")
+                if len(batch) >= batch_size:
+                    commit(batch, position[0])
+                    batch = []
+            if batch:
+                commit(batch, position[0])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    seconds = time.perf_counter() - started
+    summary = {key: state[key] for key in ("records", "inserted", "duplicates", "invalid")}
+    summary["seconds"] = seconds
+    summary["rate"] = (state["records"] - resumed_records) / seconds if seconds else 0.0
+    if progress is not None:
+        progress.write("\n")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a plain-text, CSV or JSONL journal dump into the emotions database")
+    parser.add_argument("file", help="The dump to import")
+    parser.add_argument("--format", choices=("txt", "csv", "jsonl"), help="Input format (default: from the extension)")
+    parser.add_argument("--user", default=DEFAULT_USER, help="Journal to import into")
+    parser.add_argument("--text-field", default="text", help="CSV column or JSON key holding the entry text")
+    parser.add_argument("--date-field", default="date", help="CSV column or JSON key holding the timestamp")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Entries scored and committed together")
+    parser.add_argument("--workers", type=int, help="Scoring processes (default: one per CPU)")
+    parser.add_argument("--backend", choices=sorted(ANALYZERS), help="Sentiment backend (default: the configured one)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: FILE.import-checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = import_file(
+            args.file, args.format, args.user, args.text_field, args.date_field, args.batch_size,
+            args.workers, args.backend, args.checkpoint, args.restart, progress=sys.stderr,
+        )
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
+    except Exception as e:
+        print(f"\nError importing {args.file}: {e}", file=sys.stderr)
+        if os.path.exists(args.checkpoint or default_checkpoint_path(args.file)):
+            print("Committed batches are kept; run the same command again to resume", file=sys.stderr)
+        sys.exit(1)
+
+    print(
+        f"Imported {summary['inserted']:,} of {summary['records']:,} records in {summary['seconds']:.1f}s "
+        f"({summary['rate']:,.0f} entries/s): {summary['duplicates']:,} duplicates, {summary['invalid']:,} invalid"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Words the synthetic entries are built from
+WORDS = (
+    "happy sad calm tired great terrible good bad wonderful awful okay relaxed "
+    "stressed excited angry peaceful today work friends family walk rain sun "
+    "really very not quite a the my was is felt"
+).split()
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def _random_text(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+
+def _client(host, port, requests, batch_size, read_ratio, seed, token, latencies, errors):
+    """Send requests over one keep-alive connection, recording per-endpoint latencies."""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        for _ in range(requests):
+            if rng.random() < read_ratio:
+                name, method, path, body = "GET /aggregate", "GET", "/aggregate", None
+            elif batch_size > 1:
+                entries = [{"text": _random_text(rng)} for _ in range(batch_size)]
+                name, method, path, body = "POST /entries/batch", "POST", "/entries/batch", {"entries": entries}
+            else:
+                name, method, path, body = "POST /entries", "POST", "/entries", {"text": _random_text(rng)}
+
+            payload = json.dumps(body).encode("utf-8") if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload else {}
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                ok = False
+            elapsed = time.perf_counter() - start
+            latencies.setdefault(name, []).append(elapsed)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+    finally:
+        conn.close()
+
+def run_load_test(url, requests=2000, concurrency=16, batch_size=1, read_ratio=0.2, seed=0, token=None):
+    """
+    Drive an API server with concurrent clients and measure latency and throughput.
+
+    Args:
+        url (str): Base URL of the server, e.g. http://127.0.0.1:8000
+        requests (int): Total number of requests, split across the clients
+        concurrency (int): Number of client threads, each with one keep-alive connection
+        batch_size (int): Entries per write request; above 1 uses POST /entries/batch
+        read_ratio (float): Share of requests that are GET /aggregate
+        seed (int): Random seed, for repeatable runs
+        token (str): Bearer token, for servers started with EMOTIONS_API_TOKENS
+
+    Returns:
+        dict: Totals plus, per endpoint, the request count, errors and
+            p50/p99/max latency in milliseconds
+    """
+    parts = urlsplit(url)
+    per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    results = [({}, {}) for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_client,
+            args=(parts.hostname, parts.port or 80, count, batch_size, read_ratio, seed + i, token) + results[i],
+        )
+        for i, count in enumerate(per_client)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies, errors = {}, {}
+    for client_latencies, client_errors in results:
+        for name, values in client_latencies.items():
+            latencies.setdefault(name, []).extend(values)
+        for name, count in client_errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+    endpoints = {}
+    writes = 0
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "p50_ms": _percentile(values, 0.50) * 1000,
+            "p99_ms": _percentile(values, 0.99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+        if name.startswith("POST"):
+            writes += (len(values) - errors.get(name, 0)) * (batch_size if name.endswith("batch") else 1)
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "requests_per_sec": total / elapsed if elapsed else 0.0,
+        "entries_written_per_sec": writes / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the emotions API")
+    parser.add_argument("--url", help="Server to test (default: start one on a throwaway database)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=1, help="Entries per write; above 1 uses the batch endpoint")
+    parser.add_argument("--read-ratio", type=float, default=0.2, help="Share of requests that read aggregates")
+    parser.add_argument("--token", help="Bearer token for a server with EMOTIONS_API_TOKENS")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        # Never load test the real journal
+        workdir = tempfile.mkdtemp(prefix="emotions-load-")
+        os.environ["EMOTIONS_DB_PATH"] = os.path.join(workdir, "emotions.db")
+        os.environ.setdefault("EMOTIONS_SENTIMENT_CACHE", "memory")
+        from api import make_server, serve_in_thread
+        from database import initialize_db
+
+        initialize_db()
+        server = make_server(port=0)
+        serve_in_thread(server)
+        url = f"http://127.0.0.1:{server.server_port}"
+        print(f"Started a server on {url} with a database in {workdir}")
+
+    try:
+        report = run_load_test(url, args.requests, args.concurrency, args.batch_size, args.read_ratio, token=args.token)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.writer.close()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import functools
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Instrumentation is off unless EMOTIONS_METRICS is set to 1/true/on; when off,
+# timers and counters return immediately without recording anything
+_enabled = os.environ.get('EMOTIONS_METRICS', '').lower() in ('1', 'true', 'on', 'yes')
+
+# Number of recent instrumented database calls kept in the query log
+QUERY_LOG_SIZE = 200
+
+_lock = threading.Lock()
+_timers = {}  # name -> [count, total seconds, max seconds]
+_counters = {}  # name -> value
+_queries = deque(maxlen=QUERY_LOG_SIZE)
+
+def enabled():
+    """
+    Check whether instrumentation is recording.
+
+    Returns:
+        bool: True when metrics are being collected
+    """
+    return _enabled
+
+def set_enabled(flag):
+    """
+    Turn instrumentation on or off at runtime.
+
+    Args:
+        flag (bool): True to start recording, False to stop
+    """
+    global _enabled
+    _enabled = bool(flag)
+
+def observe(name, seconds):
+    """
+    Record one timing.
+
+    Args:
+        name (str): Timer name, e.g. 'db.get_daily_rollup'
+        seconds (float): Measured duration
+    """
+    if not _enabled:
+        return
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+def increment(name, value=1):
+    """
+    Add to a counter.
+
+    Args:
+        name (str): Counter name, e.g. 'sentiment.cache_hits'
+        value (int): Amount to add
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+@contextmanager
+def timer(name):
+    """
+    Time a block of code under the given timer name.
+
+    Args:
+        name (str): Timer name
+    """
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+def _count_rows(result):
+    """
+    Best-effort row count of a query result: DataFrames, lists, dicts and row
+    totals. Tuples hold several values rather than rows, so they are not counted.
+    """
+    if result is None or isinstance(result, (bool, str, tuple)):
+        return None
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+def instrument(name, log_query=False, count_rows=None):
+    """
+    Decorator timing every call of a function.
+
+    Calls that raise are timed and logged too, and counted in '<name>.errors'.
+    Functions that catch their own errors and return a fallback value must
+    count them in their handler, with increment(f"{name}.errors").
+
+    Args:
+        name (str): Timer name
+        log_query (bool): Also add each call, with its row count, to the query log
+        count_rows (callable): Row count of a result, for results the default
+            count does not understand, e.g. (DataFrame, cursor) tuples
+
+    Returns:
+        function: The decorator
+    """
+    count = count_rows or _count_rows
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                observe(name, seconds)
+                if failed:
+                    increment(f"{name}.errors")
+                if log_query:
+                    rows = None if failed or result is None else count(result)
+                    with _lock:
+                        _queries.append((time.time(), name, seconds, rows))
+                    if rows is not None:
+                        increment(f"{name}.rows", rows)
+        return wrapper
+    return decorator
+
+def snapshot():
+    """
+    Copy the current metrics.
+
+    Returns:
+        dict: 'timers' maps names to count, total_ms, mean_ms and max_ms;
+            'counters' maps names to values; 'queries' lists recent logged
+            calls as dicts with time, name, ms and rows, newest first
+    """
+    with _lock:
+        timers = {
+            name: {
+                "count": count,
+                "total_ms": total * 1000,
+                "mean_ms": total / count * 1000,
+                "max_ms": maximum * 1000,
+            }
+            for name, (count, total, maximum) in sorted(_timers.items())
+        }
+        counters = dict(sorted(_counters.items()))
+        queries = [
+            {"time": logged_at, "name": name, "ms": seconds * 1000, "rows": rows}
+            for logged_at, name, seconds, rows in reversed(_queries)
+        ]
+    return {"timers": timers, "counters": counters, "queries": queries}
+
+def reset():
+    """Forget every timing, counter and logged query."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _queries.clear()
+
+def _metric_name(name):
+    """Turn a dotted metric name into a valid Prometheus name."""
+    return "emotions_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+def to_prometheus(gauges=None):
+    """
+    Render the metrics in the Prometheus text exposition format.
+
+    Timers become summaries (_seconds_count and _seconds_sum) with a
+    _seconds_max gauge, and counters become _total counters.
+
+    Args:
+        gauges (dict): Extra point-in-time values to include, e.g. cache sizes
+
+    Returns:
+        str: The exposition text
+    """
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+    lines = []
+    for name, (count, total, maximum) in timers:
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {count}")
+        lines.append(f"{metric}_sum {total:.6f}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {maximum:.6f}")
+    for name, value in counters:
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, value in sorted((gauges or {}).items()):
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,32 +1,371 @@
-from textblob import TextBlob
+import json
+import os
+import re
+from functools import partial
+from importlib import metadata
 
-def analyze_sentiment(text):
+import metrics
+from cache import SentimentCache, default_cache_path
+
+# Polarity thresholds used to classify a score into a sentiment category
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+# Precompiled polarity dictionary used by the lexicon backend
+LEXICON_PATH = os.path.join(os.path.dirname(__file__), 'sentiment_lexicon.json')
+
+class SentimentAnalyzer:
+    """
+    Base class for sentiment backends.
+    
+    Subclasses set a unique name, expose a version string (part of every
+    cache key, so results from another analyzer are never reused) and
+    implement polarity().
+    """
+    
+    name = None
+    
+    @property
+    def version(self):
+        raise NotImplementedError
+    
+    def polarity(self, text):
+        """
+        Score a text.
+        
+        Args:
+            text (str): The text to analyze
+        
+        Returns:
+            float: The polarity score from -1 (negative) to 1 (positive)
+        """
+        raise NotImplementedError
+
+class TextBlobAnalyzer(SentimentAnalyzer):
+    """The reference backend: TextBlob's PatternAnalyzer."""
+    
+    name = "textblob"
+    
+    _version = None
+    
+    @property
+    def version(self):
+        # Looked up once: reading package metadata costs more than a cache hit
+        if self._version is None:
+            try:
+                textblob_version = metadata.version("textblob")
+            except metadata.PackageNotFoundError:
+                textblob_version = "unknown"
+            self._version = f"textblob-{textblob_version}-pattern"
+        return self._version
+    
+    def polarity(self, text):
+        # Imported on first use; TextBlob pulls in NLTK and is slow to load
+        from textblob import TextBlob
+        
+        return TextBlob(text).sentiment.polarity
+
+# Single-pass tokenizer for the lexicon backend. Alternatives are tried in
+# order: emoticons standing on their own, sarcasm marker, ellipsis, words
+# (keeping inner hyphens and periods), then any other single non-space
+# character. Apostrophes become tokens of their own, as in TextBlob, so
+# "don't" yields "don", "'", "t".
+_LEXICON_TOKEN_PATTERN = r"\(!\)|\.\.\.|[^\W_]+(?:[-.][^\W_]+)*|\S"
+
+class LexiconAnalyzer(SentimentAnalyzer):
+    """
+    A fast backend that scores text against a precompiled polarity dictionary.
+    
+    It ports the assessment rules of TextBlob's PatternAnalyzer (modifiers,
+    negations, exclamation marks and emoticons) but replaces TextBlob's
+    object model and multi-pass tokenizer with one regular expression.
+    """
+    
+    name = "lexicon"
+    
+    def __init__(self, path=LEXICON_PATH):
+        with open(path, encoding="utf-8") as f:
+            lexicon = json.load(f)
+        self._version = f"lexicon-{lexicon['version']}"
+        # word -> (polarity, intensity, is_modifier)
+        self.words = {word: tuple(values) for word, values in lexicon["words"].items()}
+        self.negations = frozenset(lexicon["negations"])
+        self.emoticons = lexicon["emoticons"]
+        emoticons = "|".join(map(re.escape, sorted(self.emoticons, key=len, reverse=True)))
+        pattern = _LEXICON_TOKEN_PATTERN
+        if emoticons:
+            # The first-character lookahead keeps the alternation from being
+            # tried at every position
+            first = "".join(sorted({re.escape(face[0]) for face in self.emoticons}))
+            pattern = r"(?<!\S)(?=[" + first + r"])(?:" + emoticons + r")(?!\S)|" + pattern
+        self._token_re = re.compile(pattern)
+    
+    @property
+    def version(self):
+        return self._version
+    
+    def tokenize(self, text):
+        """
+        Split lowercased text into tokens, keeping emoticons whole.
+        
+        Args:
+            text (str): The text to tokenize
+        
+        Returns:
+            list: Tokens in order of appearance
+        """
+        return self._token_re.findall(text.lower())
+    
+    def polarity(self, text):
+        return self.score_tokens(self.tokenize(text))
+    
+    def score_tokens(self, tokens):
+        """
+        Score a token sequence with PatternAnalyzer's assessment rules.
+        
+        Args:
+            tokens (list of str): Lowercase tokens
+        
+        Returns:
+            float: The mean polarity of the assessed words, or 0.0
+        """
+        words = self.words
+        negations = self.negations
+        assessments = []  # [polarity, intensity, negated]
+        modifier = None
+        negation = None
+        for token in tokens:
+            entry = words.get(token)
+            if entry is not None:
+                polarity, intensity, is_modifier = entry
+                if modifier is None:
+                    assessments.append([polarity, intensity, False])
+                else:
+                    # "really good": the modifier's intensity scales this word
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                    last[1] = intensity
+                if negation is not None:
+                    last = assessments[-1]
+                    last[1] = 1.0 / last[1] if last[1] else 1.0
+                    last[2] = True
+                modifier = token if is_modifier else None
+                negation = token if token in negations else None
+                continue
+            
+            if token in negations:
+                negation = token
+            elif negation and len(token.strip("'")) > 1:
+                # Negation is only carried across small words ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                # "really not good"
+                assessments[-1][2] = True
+                negation = None
+            elif modifier and len(token) > 2:
+                modifier = None
+            if token == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+            if token == "(!)":
+                # Sarcasm marker: neutral, but it dilutes the average
+                assessments.append([0.0, 1.0, False])
+            elif token in self.emoticons:
+                assessments.append([self.emoticons[token], 1.0, False])
+        
+        if not assessments:
+            return 0.0
+        # "not good" = slightly bad, "not bad" = slightly good
+        total = sum(polarity * -0.5 if negated else polarity for polarity, _, negated in assessments)
+        return total / len(assessments)
+
+# Available backends by name
+ANALYZERS = {
+    TextBlobAnalyzer.name: TextBlobAnalyzer,
+    LexiconAnalyzer.name: LexiconAnalyzer,
+}
+
+# Backend used when none is named; EMOTIONS_SENTIMENT_BACKEND overrides it
+DEFAULT_BACKEND = os.environ.get('EMOTIONS_SENTIMENT_BACKEND', TextBlobAnalyzer.name)
+
+_analyzers = {}
+
+def get_analyzer(name=None):
+    """
+    Get a (shared) analyzer instance by backend name.
+    
+    Args:
+        name (str): One of ANALYZERS. Defaults to the configured backend
+    
+    Returns:
+        SentimentAnalyzer: The analyzer
+    """
+    name = name or DEFAULT_BACKEND
+    if name not in ANALYZERS:
+        raise ValueError(f"Unknown sentiment backend: {name} (choose from {', '.join(ANALYZERS)})")
+    if name not in _analyzers:
+        _analyzers[name] = ANALYZERS[name]()
+    return _analyzers[name]
+
+def set_backend(name):
     """
-    Analyze the sentiment of the given text using TextBlob.
+    Select the backend used by analyze_sentiment and analyze_sentiments.
+    
+    Args:
+        name (str): One of ANALYZERS
+    """
+    global DEFAULT_BACKEND
+    get_analyzer(name)
+    DEFAULT_BACKEND = name
+
+def _create_cache():
+    # EMOTIONS_SENTIMENT_CACHE: "memory" (default), "disk" to add the
+    # persistent tier next to emotions.db, or "off"
+    mode = os.environ.get('EMOTIONS_SENTIMENT_CACHE', 'memory').lower()
+    if mode == 'off':
+        return None
+    max_items = int(os.environ.get('EMOTIONS_SENTIMENT_CACHE_SIZE', 10000))
+    path = default_cache_path() if mode == 'disk' else None
+    return SentimentCache(max_items=max_items, path=path)
+
+_cache = _create_cache()
+
+def configure_cache(max_items=10000, persistent=False, path=None, enabled=True):
+    """
+    Replace the sentiment result cache.
+    
+    Args:
+        max_items (int): Maximum number of results kept in memory
+        persistent (bool): Also keep results in a SQLite file
+        path (str): Location of the SQLite file. Defaults to sentiment_cache.db next to emotions.db
+        enabled (bool): False disables caching altogether
+    """
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    if not enabled:
+        _cache = None
+        return
+    if persistent and path is None:
+        path = default_cache_path()
+    _cache = SentimentCache(max_items=max_items, path=path if persistent else None)
+
+def get_cache_stats():
+    """
+    Report hit/miss counters of the sentiment result cache.
+    
+    Returns:
+        dict: Counters from SentimentCache.stats(), or an empty dict when caching is off
+    """
+    return _cache.stats() if _cache is not None else {}
+
+def _score_text(text, backend=None):
+    """Score a single text with the given backend, bypassing the cache."""
+    polarity = get_analyzer(backend).polarity(text)
+    return categorize_polarity(polarity), polarity
+
+@metrics.instrument("sentiment.analyze_sentiment")
+def analyze_sentiment(text, backend=None):
+    """
+    Analyze the sentiment of the given text with the configured backend
+    (TextBlob unless EMOTIONS_SENTIMENT_BACKEND or set_backend says otherwise).
     
     Args:
         text (str): The text to analyze
+        backend (str): Optional backend name overriding the configured one
     
     Returns:
         tuple: (sentiment_category, sentiment_score)
             sentiment_category (str): 'Positive', 'Negative', or 'Neutral'
             sentiment_score (float): The polarity score from -1 (negative) to 1 (positive)
     """
-    # Create a TextBlob object
-    blob = TextBlob(text)
+    if _cache is None:
+        return _score_text(text, backend)
     
-    # Get the polarity score (-1 to 1)
-    polarity = blob.sentiment.polarity
-    
-    # Classify the sentiment based on the polarity score
-    if polarity > 0.1:
-        sentiment_category = "Positive"
-    elif polarity < -0.1:
-        sentiment_category = "Negative"
+    version = get_analyzer(backend).version
+    result = _cache.get(text, version)
+    if result is None:
+        metrics.increment("sentiment.cache_misses")
+        with metrics.timer("sentiment.score"):
+            result = _score_text(text, backend)
+        _cache.put(text, version, result)
     else:
-        sentiment_category = "Neutral"
+        metrics.increment("sentiment.cache_hits")
+    return result
+
+def categorize_polarity(polarity):
+    """
+    Classify a polarity score into a sentiment category.
+    
+    Args:
+        polarity (float): The polarity score from -1 (negative) to 1 (positive)
+    
+    Returns:
+        str: 'Positive', 'Negative', or 'Neutral'
+    """
+    if polarity > POSITIVE_THRESHOLD:
+        return "Positive"
+    elif polarity < NEGATIVE_THRESHOLD:
+        return "Negative"
+    return "Neutral"
+
+@metrics.instrument("sentiment.analyze_sentiments")
+def analyze_sentiments(texts, workers=None, chunksize=None, backend=None, executor=None):
+    """
+    Analyze the sentiment of many texts, spreading the work across processes.
+    
+    Args:
+        texts (iterable of str): The texts to analyze
+        workers (int): Number of worker processes. Defaults to the CPU count;
+            1 scores everything in the current process.
+        chunksize (int): Number of texts sent to a worker at a time. Defaults
+            to an even split of roughly four chunks per worker.
+        backend (str): Optional backend name overriding the configured one
+        executor (concurrent.futures.Executor): Optional running process pool
+            to score on, so that callers scoring many batches (such as the
+            importer) start the workers once. Pass its size as workers
+    
+    Returns:
+        list: (sentiment_category, sentiment_score) tuples in input order
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    
+    # Resolve the backend here so worker processes use the same one
+    analyzer = get_analyzer(backend)
+    
+    # Only score texts that are neither cached nor repeated within the batch
+    cached = _cache.get_many(texts, analyzer.version) if _cache is not None else {}
+    pending = list(dict.fromkeys(text for text in texts if text not in cached))
+    metrics.increment("sentiment.cache_hits", len(cached))
+    metrics.increment("sentiment.cache_misses", len(pending))
+    
+    if pending:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(pending)))
+        
+        # Small batches or single-worker runs are not worth the process start-up cost
+        if workers == 1:
+            scored = [_score_text(text, analyzer.name) for text in pending]
+        elif executor is not None:
+            if chunksize is None:
+                chunksize = max(1, len(pending) // (workers * 4))
+            scored = list(executor.map(partial(_score_text, backend=analyzer.name), pending, chunksize=chunksize))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            
+            if chunksize is None:
+                chunksize = max(1, len(pending) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                scored = list(executor.map(partial(_score_text, backend=analyzer.name), pending, chunksize=chunksize))
+        
+        fresh = dict(zip(pending, scored))
+        if _cache is not None:
+            _cache.put_many(fresh, analyzer.version)
+        cached.update(fresh)
     
-    return sentiment_category, polarity
+    return [cached[text] for text in texts]
 
 def get_sentiment_color(sentiment):
     """
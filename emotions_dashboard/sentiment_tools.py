@@ -0,0 +1,225 @@
+import argparse
+import json
+import random
+import time
+from importlib import metadata
+
+from sentiment import LEXICON_PATH, analyze_sentiments, categorize_polarity, configure_cache, get_analyzer
+
+def compile_lexicon(output_path=LEXICON_PATH):
+    """
+    Compile TextBlob's pattern sentiment lexicon into the JSON dictionary used
+    by the lexicon backend. Needs TextBlob installed; the result does not.
+
+    Args:
+        output_path (str): Destination of the compiled lexicon
+
+    Returns:
+        int: Number of words written
+    """
+    from textblob._text import EMOTICONS
+    from textblob.en import sentiment as pattern_sentiment
+
+    # Loading also derives the "-ly" adverbs TextBlob adds on top of the XML file
+    pattern_sentiment.load()
+    words = {}
+    for word, scores in dict.items(pattern_sentiment):
+        polarity, _, intensity = scores[None]
+        is_modifier = any(pos in scores for pos in pattern_sentiment.modifiers)
+        words[word] = [polarity, intensity, int(is_modifier)]
+
+    # PatternAnalyzer only recognizes non-alphabetic emoticons (":)" but not "xD")
+    emoticons = {}
+    for (_, polarity), faces in EMOTICONS.items():
+        for face in faces:
+            face = face.lower()
+            if not face.isalpha() and len(face) <= 5:
+                emoticons[face] = polarity
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        f.write(f'"version": {json.dumps(metadata.version("textblob") + "-1")},\n')
+        f.write(f'"negations": {json.dumps(sorted(pattern_sentiment.negations))},\n')
+        f.write(f'"emoticons": {json.dumps(emoticons, sort_keys=True, ensure_ascii=False)},\n')
+        f.write('"words": {\n')
+        f.write(",\n".join(
+            f"{json.dumps(word, ensure_ascii=False)}: {json.dumps(values)}"
+            for word, values in sorted(words.items())
+        ))
+        f.write("\n}\n}\n")
+    return len(words)
+
+def compare_backends(texts, reference="textblob", candidate="lexicon", worst=10):
+    """
+    Measure how far two sentiment backends disagree on a corpus.
+
+    Args:
+        texts (iterable of str): The corpus
+        reference (str): Backend treated as ground truth
+        candidate (str): Backend being checked
+        worst (int): Number of largest disagreements to report
+
+    Returns:
+        dict: Corpus size, mean and max absolute polarity difference, the share
+            of texts given the same category, a confusion matrix of
+            (reference, candidate) category pairs and the worst examples
+    """
+    reference_analyzer = get_analyzer(reference)
+    candidate_analyzer = get_analyzer(candidate)
+
+    count = 0
+    total_diff = 0.0
+    max_diff = 0.0
+    agreements = 0
+    confusion = {}
+    examples = []
+    for text in texts:
+        expected = reference_analyzer.polarity(text)
+        actual = candidate_analyzer.polarity(text)
+        diff = abs(expected - actual)
+        expected_category = categorize_polarity(expected)
+        actual_category = categorize_polarity(actual)
+
+        count += 1
+        total_diff += diff
+        max_diff = max(max_diff, diff)
+        agreements += expected_category == actual_category
+        pair = f"{expected_category}->{actual_category}"
+        confusion[pair] = confusion.get(pair, 0) + 1
+        examples.append((diff, text, expected, actual))
+        if len(examples) > worst * 10:
+            examples = sorted(examples, reverse=True)[:worst]
+
+    return {
+        "reference": reference,
+        "candidate": candidate,
+        "texts": count,
+        "mean_abs_diff": total_diff / count if count else 0.0,
+        "max_abs_diff": max_diff,
+        "category_agreement": agreements / count if count else 1.0,
+        "confusion": confusion,
+        "worst": [
+            {"text": text, "reference": expected, "candidate": actual}
+            for _, text, expected, actual in sorted(examples, reverse=True)[:worst]
+        ],
+    }
+
+def benchmark_backends(texts):
+    """
+    Measure scoring throughput of per-text TextBlob, per-text lexicon and
+    bulk lexicon scoring through analyze_sentiments (the path for re-scoring
+    a whole journal, spread across processes).
+    
+    Caching is bypassed so every text is actually scored.
+    
+    Args:
+        texts (list of str): The corpus
+    
+    Returns:
+        dict: Documents per second for each path, and the share of texts the
+            lexicon backend puts in the same category as TextBlob
+    """
+    textblob = get_analyzer("textblob")
+    lexicon = get_analyzer("lexicon")
+    # Load the lexicon and TextBlob's models before timing
+    textblob.polarity("warm up")
+    lexicon.polarity("warm up")
+    
+    timings = {}
+    start = time.perf_counter()
+    reference = [textblob.polarity(text) for text in texts]
+    timings["textblob"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in texts:
+        lexicon.polarity(text)
+    timings["lexicon"] = time.perf_counter() - start
+    configure_cache(enabled=False)
+    try:
+        start = time.perf_counter()
+        bulk = analyze_sentiments(texts, backend="lexicon")
+        timings["lexicon_bulk"] = time.perf_counter() - start
+    finally:
+        configure_cache()
+    
+    agreements = sum(
+        categorize_polarity(expected) == category
+        for expected, (category, _) in zip(reference, bulk)
+    )
+    return {
+        "texts": len(texts),
+        "docs_per_sec": {name: len(texts) / seconds if seconds else 0.0 for name, seconds in timings.items()},
+        "speedup_over_textblob": {
+            name: timings["textblob"] / seconds if seconds else 0.0
+            for name, seconds in timings.items() if name != "textblob"
+        },
+        "category_agreement": agreements / len(texts) if texts else 1.0,
+    }
+
+def synthetic_corpus(count, seed=0):
+    """
+    Generate journal-like texts mixing lexicon words, modifiers and negations.
+    
+    Args:
+        count (int): Number of texts
+        seed (int): Random seed, for repeatable runs
+    
+    Returns:
+        list: The generated texts
+    """
+    rng = random.Random(seed)
+    words = sorted(get_analyzer("lexicon").words)
+    fillers = ("i", "felt", "today", "was", "the", "a", "my", "day", "with", "friends", "at", "work",
+               "and", "but", "so", "very", "really", "not", "never", "!", ",", ".", ":)", ":(")
+    texts = []
+    for _ in range(count):
+        length = rng.randint(4, 40)
+        texts.append(" ".join(
+            rng.choice(words) if rng.random() < 0.25 else rng.choice(fillers)
+            for _ in range(length)
+        ))
+    return texts
+
+def _read_corpus(path, user_id=None):
+    """Yield texts from a file with one entry per line, or from a journal in the database."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line.rstrip("\n")
+    else:
+        from database import DEFAULT_USER, initialize_db, iter_entry_rows
+
+        initialize_db()
+        for (text,) in iter_entry_rows(columns=["text"], user_id=user_id or DEFAULT_USER):
+            yield text
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sentiment backend tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = subcommands.add_parser("compile-lexicon", help="Regenerate sentiment_lexicon.json from TextBlob")
+    compile_parser.add_argument("--output", default=LEXICON_PATH)
+
+    parity_parser = subcommands.add_parser("parity", help="Report how far two backends disagree on a corpus")
+    parity_parser.add_argument("--corpus", help="Text file with one entry per line (default: the emotions table)")
+    parity_parser.add_argument("--user", help="Journal to read when no corpus file is given")
+    parity_parser.add_argument("--reference", default="textblob")
+    parity_parser.add_argument("--candidate", default="lexicon")
+    parity_parser.add_argument("--worst", type=int, default=10, help="Number of largest disagreements to show")
+    
+    benchmark_parser = subcommands.add_parser("benchmark", help="Compare scoring throughput of the backends")
+    benchmark_parser.add_argument("--corpus", help="Text file with one entry per line (default: synthetic texts)")
+    benchmark_parser.add_argument("--size", type=int, default=10000, help="Number of synthetic texts")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile-lexicon":
+        print(f"Wrote {compile_lexicon(args.output)} words to {args.output}")
+    elif args.command == "parity":
+        report = compare_backends(_read_corpus(args.corpus, args.user), args.reference, args.candidate, args.worst)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    elif args.command == "benchmark":
+        texts = list(_read_corpus(args.corpus)) if args.corpus else synthetic_corpus(args.size)
+        print(json.dumps(benchmark_backends(texts), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import database
+from api import make_server, parse_tokens, serve_in_thread
+from writer import BackgroundWriter
+
+@pytest.fixture
+def api_url(temp_db):
+    """An API server on a free port, backed by a throwaway database"""
+    server = make_server(port=0, writer=BackgroundWriter(backend="lexicon"))
+    serve_in_thread(server)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    server.writer.close()
+
+def _request(url, body=None, token=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    headers = {"Content-Type": "application/json"}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_post_and_query_entries(api_url):
+    """Single and batch posts are scored, committed and visible to range and aggregate queries"""
+    status, entry = _request(f"{api_url}/entries", {"text": "What a wonderful day", "date": "2024-05-01T09:00:00"})
+    assert status == 201
+    assert entry["sentiment"] == "Positive" and entry["date"] == "2024-05-01 09:00:00"
+
+    status, batch = _request(f"{api_url}/entries/batch", {
+        "user_id": "alice",
+        "entries": [{"text": "A terrible day", "date": "2024-05-02"}, {"text": "Fine", "date": "2024-05-03"}],
+    })
+    assert status == 201 and batch["inserted"] == 2
+    assert batch["results"][0]["sentiment"] == "Negative"
+
+    status, result = _request(f"{api_url}/entries?start=2024-05-01&end=2024-05-31&user_id=alice&limit=1")
+    assert status == 200
+    assert [e["text"] for e in result["entries"]] == ["Fine"]
+
+    status, aggregate = _request(f"{api_url}/aggregate?user_id=alice")
+    assert status == 200
+    assert aggregate["entries"] == 2 and aggregate["negative"] == 1
+    assert [day["day"] for day in aggregate["days"]] == ["2024-05-02", "2024-05-03"]
+    assert _request(f"{api_url}/aggregate")[1]["positive"] == 1
+
+    status, chart = _request(f"{api_url}/charts/timeline?user_id=alice")
+    assert status == 200
+    assert chart["data"][2]["x"] == ["2024-05-02", "2024-05-03"]
+
+def test_rejects_bad_requests(api_url):
+    """Malformed input gets a 4xx JSON error instead of a server error"""
+    assert _request(f"{api_url}/entries", {"text": "  "})[0] == 400
+    assert _request(f"{api_url}/entries", {"text": "Hi", "date": "yesterday"})[0] == 400
+    assert _request(f"{api_url}/entries", {"text": "Hi", "date": 1e20})[0] == 400
+    assert _request(f"{api_url}/entries/batch", {"entries": []})[0] == 400
+    assert _request(f"{api_url}/entries?start=2024-13-01")[0] == 400
+    assert _request(f"{api_url}/entries", {"text": "Hi", "user_id": ""})[0] == 400
+    assert _request(f"{api_url}/entries/batch", {"entries": [{"text": "Hi"}], "user_id": 7})[0] == 400
+    assert _request(f"{api_url}/aggregate?user_id=%20")[0] == 400
+    status, error = _request(f"{api_url}/nowhere")
+    assert status == 404 and "error" in error
+
+def test_tokens_bind_requests_to_a_journal(temp_db):
+    """With tokens configured, requests need one and only reach the token's journal"""
+    server = make_server(port=0, writer=BackgroundWriter(backend="lexicon"), tokens=parse_tokens("s3cret:alice, other:bob"))
+    serve_in_thread(server)
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        assert _request(f"{url}/entries", {"text": "Sneaking in"})[0] == 401
+        assert _request(f"{url}/entries?user_id=alice", token="guess")[0] == 401
+        assert _request(f"{url}/health")[0] == 200
+
+        status, entry = _request(f"{url}/entries", {"text": "A lovely walk", "date": "2024-05-01"}, token="s3cret")
+        assert status == 201 and entry["user_id"] == "alice"
+        assert _request(f"{url}/entries", {"text": "Not mine", "user_id": "bob"}, token="s3cret")[0] == 403
+        assert _request(f"{url}/entries?user_id=bob", token="s3cret")[0] == 403
+
+        assert [e["text"] for e in _request(f"{url}/entries", token="s3cret")[1]["entries"]] == ["A lovely walk"]
+        assert _request(f"{url}/entries", token="other")[1]["entries"] == []
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.writer.close()
+
+def test_post_times_out_on_a_stuck_writer(temp_db, monkeypatch):
+    """A post whose entry is not committed in time gets a 503 instead of hanging"""
+    import threading
+    import writer
+
+    release = threading.Event()
+    original = writer.analyze_sentiments
+    monkeypatch.setattr(writer, "analyze_sentiments", lambda texts, **kwargs: release.wait(10) and original(texts, **kwargs))
+    server = make_server(port=0, writer=BackgroundWriter(backend="lexicon"), result_timeout=0.2)
+    serve_in_thread(server)
+    try:
+        status, error = _request(f"http://127.0.0.1:{server.server_port}/entries", {"text": "Waiting"})
+        assert status == 503 and "error" in error
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+        server.writer.close()
@@ -0,0 +1,28 @@
+import benchmark
+import database
+
+def test_generate_journal_is_repeatable():
+    """The synthetic journal is deterministic, in date order and within its range"""
+    first = list(benchmark.generate_journal(100, days=10, seed=3))
+    assert first == list(benchmark.generate_journal(100, days=10, seed=3))
+    dates = [timestamp for _, _, _, timestamp in first]
+    assert dates == sorted(dates)
+    assert len({timestamp.date() for timestamp in dates}) == 10
+
+def test_run_benchmarks_and_compare(tmp_path):
+    """A tiny run reports every section and regressions are detected in the right direction"""
+    original_path = database.DB_PATH
+    report = benchmark.run_benchmarks([50], score_sample=20, single_inserts=5, repeat=1, workdir=str(tmp_path / "bench"))
+    assert database.DB_PATH == original_path
+    results = report["sizes"]["50"]
+    assert results["save_entries_rows"] == 50
+    assert results["entries_365d_rows"] == 55
+    assert results["wordcloud_png_bytes"] > 0
+    assert report["charts"]["go_30_json_bytes"] < report["charts"]["px_30_json_bytes"]
+    
+    slower = {"scoring": {"analyze_sentiment_cached_per_sec": 50.0}, "sizes": {"50": {"entries_7d_ms": 3.0}}}
+    faster = {"scoring": {"analyze_sentiment_cached_per_sec": 100.0}, "sizes": {"50": {"entries_7d_ms": 1.0}}}
+    assert [name for name, _, _ in benchmark.compare_reports(faster, slower)] == [
+        "50.entries_7d_ms", "scoring.analyze_sentiment_cached_per_sec",
+    ]
+    assert benchmark.compare_reports(slower, faster) == []
@@ -0,0 +1,31 @@
+import os
+
+from cache import ImageCache, LRUCache, default_cache_path
+
+def test_lru_cache_evicts_least_recent():
+    """The oldest untouched key is evicted first"""
+    cache = LRUCache(max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_image_cache_byte_budget_and_spill(tmp_path):
+    """Images over the byte budget spill to disk and come back from there"""
+    cache = ImageCache(max_bytes=10, spill_dir=str(tmp_path))
+    cache.put(("2023-01-01", "2023-01-31", 1), b"x" * 6)
+    cache.put(("2023-02-01", "2023-02-28", 1), b"y" * 6)
+    assert cache.stats()["memory_bytes"] == 6
+    
+    assert cache.get(("2023-01-01", "2023-01-31", 1)) == b"x" * 6
+    assert cache.get(("2023-01-01", "2023-01-31", 2)) is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+def test_default_cache_path_follows_the_database(tmp_path, monkeypatch):
+    """The persistent sentiment cache sits next to whichever database is configured"""
+    monkeypatch.setenv("EMOTIONS_DB_PATH", str(tmp_path / "journal.db"))
+    assert default_cache_path() == str(tmp_path / "sentiment_cache.db")
+    assert default_cache_path(os.path.join("elsewhere", "emotions.db")) == os.path.abspath(os.path.join("elsewhere", "sentiment_cache.db"))
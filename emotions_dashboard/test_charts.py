@@ -0,0 +1,43 @@
+import pandas as pd
+
+import charts
+
+def test_figures_use_compact_data_and_shared_template():
+    """Figures are built from plain arrays, in order, on the one cached template"""
+    bars = charts.distribution_figure(positive=3, negative=0, neutral=5)
+    assert list(bars.data[0].x) == ["Neutral", "Positive"]
+    assert list(bars.data[0].marker.color) == [charts.SENTIMENT_COLORS["Neutral"], charts.SENTIMENT_COLORS["Positive"]]
+
+    series = pd.DataFrame({
+        "bucket": ["2024-01-01", "2024-01-08"],
+        "entries": [3, 1],
+        "mean_score": [0.123456, -0.5],
+        "score_min": [-0.2, -0.5],
+        "score_max": [0.9, -0.5],
+        "rolling_mean": [0.123456, 0.0],
+    })
+    timeline = charts.timeline_from_series("week", series)
+    assert [trace.name for trace in timeline.data][2:] == ["Average", "4-week average"]
+    assert list(timeline.data[2].y) == [0.1235, -0.5]
+    assert timeline.layout.xaxis.title.text == "Week starting"
+    assert timeline.layout.template == bars.layout.template == charts.layout_template()
+
+def test_figure_cache_builds_once_per_key():
+    """Figures and their JSON are built once per data version and failures are not kept"""
+    builds = []
+
+    def build():
+        builds.append(1)
+        return charts.distribution_figure(1, 2, 3)
+
+    key = ("distribution", "test-user", "2024-01-01", "2024-01-31", 1)
+    figure = charts.cached_figure(key, build)
+    assert charts.cached_figure(key, build) is figure
+    text = charts.cached_figure_json(key, build)
+    assert text == figure.to_json() and charts.cached_figure_json(key, build) is text
+    assert len(builds) == 1
+
+    charts.cached_figure(key[:-1] + (2,), build)
+    assert len(builds) == 2
+    assert charts.cached_figure(("timeline", "test-user"), lambda: None) is None
+    assert charts.cached_figure(("timeline", "test-user"), build) is not None
@@ -0,0 +1,308 @@
+import pytest
+
+import database
+
+def test_connection_pool_reuses_connections(temp_db):
+    """Connections are configured once and handed back out"""
+    with database.get_connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with database.get_connection() as conn:
+        assert conn is first
+
+def test_save_and_read_entries(temp_db):
+    """Entries round-trip through the pooled connections"""
+    assert database.save_entry("A calm and pleasant walk", "Positive", 0.4)
+    df = database.get_all_entries()
+    assert len(df) == 1
+    assert df.loc[0, "sentiment"] == "Positive"
+
+def test_save_entries_keeps_caller_dates(temp_db):
+    """Bulk inserts accept tuples and dicts and keep historical timestamps"""
+    entries = [
+        ("Rainy but cozy", "Positive", 0.3, "2023-01-15 08:30:00"),
+        {"text": "Long day", "sentiment": "Negative", "sentiment_score": -0.2, "date": "2023-01-16T21:00:00"},
+        ("Just a day", "Neutral", 0.0),
+    ]
+    assert database.save_entries(entries, batch_size=2) == 3
+    
+    df = database.get_all_entries()
+    assert set(df["date"]) >= {"2023-01-15 08:30:00", "2023-01-16 21:00:00"}
+
+def test_save_entries_reports_partial_progress(temp_db):
+    """A bad row only loses its own batch"""
+    entries = [("Fine", "Neutral", 0.0, "2023-02-01"), ("Broken", "Neutral", None, "2023-02-02")]
+    assert database.save_entries(entries, batch_size=1) == 1
+    assert len(database.get_all_entries()) == 1
+
+def test_migrations_backfill_legacy_database(tmp_path, monkeypatch):
+    """Databases created before migrations get indexes, a journal, a rollup and a search index"""
+    import sqlite3
+    from datetime import date
+    
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute('''
+    CREATE TABLE emotions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TIMESTAMP NOT NULL,
+        text TEXT NOT NULL,
+        sentiment TEXT NOT NULL,
+        sentiment_score REAL NOT NULL
+    )
+    ''')
+    conn.execute("INSERT INTO emotions (date, text, sentiment, sentiment_score) VALUES ('1970-01-02 00:00:00', 'Old', 'Neutral', 0.0)")
+    conn.commit()
+    conn.close()
+    
+    monkeypatch.setattr(database, "DB_PATH", path)
+    try:
+        database.initialize_db()
+        database.initialize_db()  # idempotent
+        with database.get_connection() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+            assert conn.execute("SELECT user_id FROM emotions").fetchone()[0] == database.DEFAULT_USER
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM emotions WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date DESC",
+                (database.DEFAULT_USER, "2023-01-01", "2023-02-01")
+            ).fetchall()
+        assert any("idx_emotions_user_date" in row[-1] for row in plan)
+        assert database.get_daily_rollup(date(1970, 1, 1), date(1970, 1, 31))["score_count"].tolist() == [1]
+        assert database.search_entries("old")["text"].tolist() == ["Old"]
+    finally:
+        database.close_connections()
+
+def test_daily_rollup_tracks_inserts(temp_db):
+    """Single and bulk inserts keep the rollup in step with a full rebuild"""
+    from datetime import date
+    
+    database.save_entry("Great start", "Positive", 0.5, "2023-03-01 09:00:00")
+    database.save_entries([
+        ("Bad evening", "Negative", -0.5, "2023-03-01 21:00:00"),
+        ("Meh", "Neutral", 0.0, "2023-03-02 12:00:00"),
+    ])
+    incremental = database.get_daily_rollup(date(2023, 3, 1), date(2023, 3, 31))
+    assert list(incremental["day"]) == ["2023-03-01", "2023-03-02"]
+    assert incremental.loc[0, "positive_count"] == 1 and incremental.loc[0, "negative_count"] == 1
+    assert incremental.loc[0, "sentiment_score"] == 0.0
+    assert incremental.loc[0, "score_sq_sum"] == 0.5
+    
+    assert database.rebuild_daily_rollup()
+    rebuilt = database.get_daily_rollup(date(2023, 3, 1), date(2023, 3, 31))
+    assert rebuilt.equals(incremental)
+
+def test_iter_entries_streams_chunks(temp_db, tmp_path):
+    """Readers honour chunk size, column selection and date bounds"""
+    from datetime import date
+    
+    database.save_entries(("Entry %d" % i, "Neutral", 0.0, "2023-04-%02d 12:00:00" % (i + 1)) for i in range(5))
+    
+    chunks = list(database.iter_entries(columns=["id", "sentiment"], chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(chunks[0].columns) == ["id", "sentiment"]
+    
+    rows = list(database.iter_entry_rows(date(2023, 4, 2), date(2023, 4, 3), columns=["text"]))
+    assert rows == [("Entry 2",), ("Entry 1",)]
+    
+    with pytest.raises(ValueError):
+        list(database.iter_entries(columns=["password"]))
+    
+    backup = tmp_path / "backup.csv"
+    assert database.backup_to_csv(str(backup), chunk_size=2)
+    assert len(backup.read_text().splitlines()) == 6
+
+def test_term_index_tracks_inserts(temp_db):
+    """Saved entries feed the word cloud index, and a rebuild agrees"""
+    from datetime import date
+    
+    database.save_entry("Sunny walk, happy dog", "Positive", 0.6, "2023-06-01 10:00:00")
+    database.save_entries([("Happy happy day", "Positive", 0.8, "2023-06-02 10:00:00")])
+    
+    frequencies = database.get_term_frequencies(date(2023, 6, 1), date(2023, 6, 30))
+    assert frequencies["happy"] == 3
+    assert list(frequencies)[0] == "happy"
+    assert database.get_term_frequencies(date(2023, 6, 2), date(2023, 6, 2)) == {"happy": 2, "day": 1}
+    
+    assert database.rebuild_term_index()
+    assert database.get_term_frequencies(date(2023, 6, 1), date(2023, 6, 30)) == frequencies
+
+def test_generation_bumps_on_writes(temp_db):
+    """Every write moves the generation forward"""
+    before = database.get_generation()
+    database.save_entry("Calm", "Neutral", 0.0)
+    database.save_entries([("Calm again", "Neutral", 0.0)])
+    assert database.get_generation() == before + 2
+
+def test_generation_sees_writes_from_other_connections(temp_db):
+    """Writers outside the pool are seen by the next read"""
+    import sqlite3
+    
+    before = database.get_generation()
+    assert database.get_generation() == before
+    
+    conn = sqlite3.connect(temp_db)
+    conn.execute("UPDATE meta SET value = value + 5 WHERE key = 'generation'")
+    conn.commit()
+    assert database.get_generation() == before + 5
+    
+    # After a checkpoint the WAL is rewritten from its start, often at the same size
+    conn.execute("PRAGMA wal_checkpoint(RESTART)")
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+    conn.commit()
+    conn.close()
+    assert database.get_generation() == before + 6
+
+def test_get_date_bounds_uses_index(temp_db):
+    """Bounds come from index lookups and cope with an empty table"""
+    from datetime import date
+    
+    assert database.get_date_bounds() == (None, None)
+    database.save_entries([
+        ("Later", "Neutral", 0.0, "2023-08-20 23:59:00"),
+        ("Earlier", "Neutral", 0.0, "2023-07-01 00:01:00"),
+    ])
+    assert database.get_date_bounds() == (date(2023, 7, 1), date(2023, 8, 20))
+    
+    with database.get_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT (SELECT MIN(date) FROM emotions WHERE user_id = ?1), "
+            "(SELECT MAX(date) FROM emotions WHERE user_id = ?1)",
+            (database.DEFAULT_USER,)
+        ).fetchall()
+    assert all("SCAN emotions" not in row[-1] for row in plan)
+
+def test_journals_are_isolated(temp_db):
+    """Reads, derived tables and generations are scoped to one journal"""
+    from datetime import date
+    
+    database.save_entry("Happy sunny day", "Positive", 0.8, "2023-09-01 10:00:00", user_id="alice")
+    database.save_entries([
+        ("Gloomy rainy day", "Negative", -0.6, "2023-09-01 11:00:00"),
+        {"text": "Rainy again", "sentiment": "Negative", "sentiment_score": -0.2, "date": "2023-09-03 11:00:00"},
+    ], user_id="bob")
+    
+    assert list(database.get_all_entries("alice")["text"]) == ["Happy sunny day"]
+    assert len(database.get_all_entries("bob")) == 2
+    assert database.get_all_entries().empty
+    assert database.get_date_bounds("bob") == (date(2023, 9, 1), date(2023, 9, 3))
+    assert database.get_daily_rollup(date(2023, 9, 1), date(2023, 9, 30), "alice")["positive_count"].tolist() == [1]
+    assert "rainy" not in database.get_term_frequencies(date(2023, 9, 1), date(2023, 9, 30), user_id="alice")
+    assert database.get_term_frequencies(date(2023, 9, 1), date(2023, 9, 30), user_id="bob")["rainy"] == 2
+    assert database.get_users() == ["alice", "bob"]
+    
+    # A write to one journal leaves the other's cached reads valid
+    alice, bob = database.get_generation("alice"), database.get_generation("bob")
+    database.save_entry("Still happy", "Positive", 0.5, user_id="alice")
+    assert database.get_generation("alice") == alice + 1
+    assert database.get_generation("bob") == bob
+    
+    assert database.rebuild_daily_rollup() and database.rebuild_term_index()
+    assert database.get_generation("bob") == bob + 2
+    assert database.get_term_frequencies(date(2023, 9, 1), date(2023, 9, 30), user_id="bob")["rainy"] == 2
+
+def test_search_entries_ranks_and_filters(temp_db, monkeypatch):
+    """Search is ranked, scoped to a journal and its filters, and follows edits"""
+    from datetime import date
+    
+    database.save_entries([
+        ("Coffee with friends, coffee all afternoon", "Positive", 0.6, "2023-10-01 10:00:00"),
+        ("Spilled coffee at work", "Negative", -0.4, "2023-10-02 10:00:00"),
+        ("A quiet walk", "Neutral", 0.0, "2023-10-03 10:00:00"),
+        ("Coffeehouse \"open mic\" night AND more", "Positive", 0.5, "2023-11-05 20:00:00"),
+    ])
+    database.save_entry("Coffee alone", "Neutral", 0.0, "2023-10-01 09:00:00", user_id="alice")
+    
+    results = database.search_entries("coffee")
+    assert results["text"].tolist() == ["Coffee with friends, coffee all afternoon", "Spilled coffee at work"]
+    assert results["rank"].is_monotonic_increasing
+    assert len(database.search_entries("coffee*")) == 3
+    assert database.search_entries("coffee", sentiment="Negative")["text"].tolist() == ["Spilled coffee at work"]
+    assert database.search_entries("coffee", date(2023, 10, 2), date(2023, 10, 31))["text"].tolist() == ["Spilled coffee at work"]
+    assert database.search_entries("coffee", limit=1, offset=1)["text"].tolist() == ["Spilled coffee at work"]
+    assert database.search_entries('"open AND')["sentiment"].tolist() == ["Positive"]
+    assert database.search_entries("coffee", user_id="alice")["text"].tolist() == ["Coffee alone"]
+    # Journal ids are matched in their own column, exactly, and never as search words
+    database.save_entry("More coffee", "Neutral", 0.0, "2023-10-01 09:00:00", user_id="alice smith")
+    database.save_entry("Just tea", "Neutral", 0.0, "2023-10-01 09:00:00", user_id="coffee")
+    database.save_entry("Tea time", "Neutral", 0.0, "2023-10-01 09:00:00", user_id="??")
+    for share in (0, 2):  # with and without the journal column
+        with monkeypatch.context() as patch:
+            patch.setattr(database, "SEARCH_JOURNAL_SHARE", share)
+            assert database.search_entries("coffee", user_id="alice")["text"].tolist() == ["Coffee alone"]
+            assert database.search_entries("coffee", user_id="coffee").empty
+            assert database.search_entries("tea", user_id="??")["text"].tolist() == ["Tea time"]
+    assert database.search_entries("  ").empty
+    
+    # Past the candidate window only the newest matches are ranked
+    with monkeypatch.context() as patch:
+        patch.setattr(database, "SEARCH_CANDIDATES", 1)
+        assert database.search_entries("coffee")["text"].tolist() == ["Spilled coffee at work"]
+    
+    with database.get_connection() as conn:
+        conn.execute("UPDATE emotions SET text = 'Tea instead' WHERE text = 'Spilled coffee at work'")
+        conn.execute("DELETE FROM emotions WHERE text = 'A quiet walk'")
+        conn.commit()
+    assert database.search_entries("tea")["sentiment"].tolist() == ["Negative"]
+    assert len(database.search_entries("coffee")) == 1
+    assert database.search_entries("walk").empty
+
+def test_entries_page_follows_cursor(temp_db):
+    """Keyset pages cover the range newest first, without gaps or repeats on equal dates"""
+    from datetime import date
+    
+    database.save_entries([(f"Entry {i}", "Positive" if i % 2 else "Neutral", 0.0, f"2023-12-0{1 + i // 3} 08:00:00") for i in range(7)])
+    database.save_entry("Outside the range", "Neutral", 0.0, "2023-12-20 08:00:00")
+    
+    texts, cursor, pages = [], None, 0
+    while True:
+        entries, cursor = database.get_entries_page(date(2023, 12, 1), date(2023, 12, 10), limit=3, before=cursor)
+        texts += entries["text"].tolist()
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert texts == [f"Entry {i}" for i in (6, 5, 4, 3, 2, 1, 0)]
+    
+    entries, cursor = database.get_entries_page(limit=2, sentiment="Positive")
+    assert entries["text"].tolist() == ["Entry 5", "Entry 3"]
+    assert database.get_entries_page(limit=2, before=cursor, sentiment="Positive")[0]["text"].tolist() == ["Entry 1"]
+    
+    with database.get_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM emotions WHERE user_id = ? AND date <= ? AND (date < ? OR id < ?) "
+            "ORDER BY date DESC, id DESC LIMIT 4",
+            (database.DEFAULT_USER, "2023-12-02", "2023-12-02", 5)
+        ).fetchall()
+    assert any("idx_emotions_user_date" in row[-1] for row in plan)
+    assert all("TEMP B-TREE" not in row[-1] for row in plan)
+
+def test_sentiment_series_buckets_and_bands(temp_db):
+    """The series is bucketed from the rollup with entry score bands and a weighted rolling mean"""
+    from datetime import date
+    
+    database.save_entries([
+        ("A", "Positive", 0.8, "2024-01-01 09:00:00"),
+        ("B", "Negative", -0.4, "2024-01-01 21:00:00"),
+        ("C", "Neutral", 0.0, "2024-01-03 09:00:00"),
+        ("D", "Positive", 0.6, "2024-01-08 09:00:00"),
+        ("E", "Positive", 0.3, "2024-03-15 09:00:00"),
+    ])
+    
+    resolution, days = database.get_sentiment_series(date(2024, 1, 1), date(2024, 1, 31))
+    assert resolution == "day"
+    assert days["bucket"].tolist() == ["2024-01-01", "2024-01-03", "2024-01-08"]
+    assert days["score_min"].tolist() == [-0.4, 0.0, 0.6] and days["score_max"].tolist() == [0.8, 0.0, 0.6]
+    # The 7-day average of January 8 covers January 2-8 only
+    assert days["rolling_mean"].round(3).tolist() == [0.2, round(0.4 / 3, 3), 0.3]
+    
+    _, weeks = database.get_sentiment_series(date(2024, 1, 1), date(2024, 3, 31), resolution="week")
+    assert weeks["bucket"].tolist() == ["2024-01-01", "2024-01-08", "2024-03-11"]
+    assert weeks["entries"].tolist() == [3, 1, 1]
+    assert weeks["rolling_mean"].round(3).tolist() == [round(0.4 / 3, 3), 0.25, 0.3]
+    
+    # The point budget picks the resolution from the days that have data
+    resolution, months = database.get_sentiment_series(date(2000, 1, 1), date(2024, 12, 31), max_points=10)
+    assert resolution == "month"
+    assert months["bucket"].tolist() == ["2024-01-01", "2024-03-01"]
+    assert months["rolling_mean"].round(3).tolist() == [0.25, 0.26]
+    assert database.choose_resolution(date(2000, 1, 1), date(2024, 12, 31), max_points=100) == "year"
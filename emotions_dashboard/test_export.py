@@ -0,0 +1,41 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+import database
+from export import export_entries, infer_format
+
+@pytest.fixture
+def populated_db(temp_db):
+    """A throwaway database with a few entries"""
+    database.save_entries(("Entry %d" % i, "Positive", 0.5, "2023-05-%02d 08:00:00" % (i + 1)) for i in range(7))
+    return temp_db
+
+def test_infer_format():
+    """Formats are picked from the longest matching extension"""
+    assert infer_format("out.csv.gz") == "csv.gz"
+    assert infer_format("out.parquet") == "parquet"
+    assert infer_format("out.txt") == "csv"
+
+def test_export_csv_and_gzip(populated_db, tmp_path):
+    """Chunked CSV output matches the table, compressed or not"""
+    plain = tmp_path / "out.csv"
+    assert export_entries(str(plain), chunk_size=3) == 7
+    compressed = tmp_path / "out.csv.gz"
+    assert export_entries(str(compressed), chunk_size=3, columns=["date", "text"]) == 7
+    
+    with gzip.open(compressed, "rt") as f:
+        df = pd.read_csv(f)
+    assert list(df.columns) == ["date", "text"]
+    assert len(pd.read_csv(plain)) == len(df) == 7
+
+def test_export_parquet_date_range(populated_db, tmp_path):
+    """Parquet export writes every chunk under one schema"""
+    pytest.importorskip("pyarrow")
+    from datetime import date
+    
+    out = tmp_path / "out.parquet"
+    assert export_entries(str(out), start_date=date(2023, 5, 2), end_date=date(2023, 5, 4), chunk_size=2) == 3
+    df = pd.read_parquet(out)
+    assert list(df["text"]) == ["Entry 3", "Entry 2", "Entry 1"]
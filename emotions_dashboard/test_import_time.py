@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+# Modules the app must only load once a chart, word cloud or TextBlob score is
+# needed. Streamlit itself imports the top-level plotly package (but not its
+# chart builders), pandas and matplotlib, so those cannot be deferred.
+LAZY_MODULES = ("plotly.express", "plotly.graph_objs", "wordcloud", "textblob", "nltk")
+
+# Budget for what `import app` adds on top of importing streamlit itself
+IMPORT_BUDGET_MS = float(os.environ.get("EMOTIONS_IMPORT_BUDGET_MS", 500))
+
+def _import_times(module):
+    """Run `python -X importtime -c "import <module>"` and parse the report"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if cumulative.strip().isdigit():
+            times[name] = int(cumulative)
+    return times
+
+def test_app_import_is_lazy_and_within_budget():
+    """Importing the app loads no plotting or NLP libraries and stays within the cold start budget"""
+    times = _import_times("app")
+    eager = [name for name in times if name.startswith(LAZY_MODULES)]
+    assert not eager, f"imported at startup: {', '.join(sorted(eager))}"
+    
+    # Streamlit's own import cost is outside the app's control
+    added_ms = (times["app"] - times.get("streamlit", 0)) / 1000
+    assert added_ms < IMPORT_BUDGET_MS, f"import app took {added_ms:.0f} ms beyond streamlit"
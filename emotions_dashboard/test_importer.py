@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import database
+import importer
+
+def _import(path, **kwargs):
+    return importer.import_file(str(path), workers=1, backend="lexicon", **kwargs)
+
+def test_imports_csv_and_jsonl_once(temp_db, tmp_path):
+    """Records keep their timestamps, bad ones are counted and a second import adds nothing"""
+    dump = tmp_path / "journal.jsonl"
+    dump.write_text("\n".join([
+        json.dumps({"text": "What a wonderful day", "date": "2024-03-01T08:00:00"}),
+        json.dumps({"text": "A terrible   day", "date": 1709460000}),
+        "not json",
+        json.dumps({"date": "2024-03-04"}),
+    ]) + "\n", encoding="utf-8")
+    summary = _import(dump, batch_size=2)
+    assert (summary["records"], summary["inserted"], summary["invalid"]) == (4, 2, 2)
+
+    sheet = tmp_path / "journal.csv"
+    sheet.write_text('when,entry\n2024-03-01 08:00:00,What a  wonderful day\n2024-03-05,"Calm,\nquiet evening"\n', encoding="utf-8")
+    summary = _import(sheet, text_field="entry", date_field="when")
+    assert (summary["inserted"], summary["duplicates"]) == (1, 1)
+
+    df = database.get_all_entries()
+    assert sorted(df["date"])[0] == "2024-03-01 08:00:00"
+    assert df.loc[df["date"] == "2024-03-05 00:00:00", "text"].tolist() == ["Calm,\nquiet evening"]
+    assert _import(dump)["duplicates"] == 2
+    assert not (tmp_path / "journal.jsonl.import-checkpoint.json").exists()
+
+def test_text_lines_take_dates_from_date_lines(temp_db, tmp_path):
+    """Plain-text entries use their own timestamp or the date line above them"""
+    dump = tmp_path / "journal.txt"
+    dump.write_text("2024-02-01\nGood morning\n\n2024-02-02 21:30 - Bad night\nStill tired\n", encoding="utf-8")
+    assert _import(dump)["inserted"] == 3
+
+    df = database.get_all_entries()
+    assert sorted(zip(df["date"], df["text"])) == [
+        ("2024-02-01 00:00:00", "Good morning"),
+        ("2024-02-01 00:00:00", "Still tired"),
+        ("2024-02-02 21:30:00", "Bad night"),
+    ]
+
+def test_interrupted_import_resumes(temp_db, tmp_path, monkeypatch):
+    """A failed batch leaves a checkpoint, and running again imports only the rest"""
+    dump = tmp_path / "journal.jsonl"
+    dump.write_text("".join(
+        json.dumps({"text": f"Entry number {i}", "date": f"2024-01-{i + 1:02d}"}) + "\n" for i in range(10)
+    ), encoding="utf-8")
+
+    calls = []
+    def failing_save(entries, user_id):
+        calls.append(len(entries))
+        if len(calls) == 3:
+            raise RuntimeError("disk full")
+        return database.save_new_entries(entries, user_id=user_id)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(importer, "save_new_entries", failing_save)
+        with pytest.raises(RuntimeError):
+            _import(dump, batch_size=3)
+    assert len(database.get_all_entries()) == 6
+    checkpoint = json.loads((tmp_path / "journal.jsonl.import-checkpoint.json").read_text())
+    assert checkpoint["records"] == 6
+
+    summary = _import(dump, batch_size=3)
+    assert (summary["records"], summary["inserted"], summary["duplicates"]) == (10, 10, 0)
+    assert sorted(database.get_all_entries()["text"]) == sorted(f"Entry number {i}" for i in range(10))
@@ -0,0 +1,82 @@
+import pytest
+
+import database
+import metrics
+
+@pytest.fixture
+def recording(temp_db):
+    """Record metrics against a throwaway database, restoring the switch afterwards"""
+    was_enabled = metrics.enabled()
+    metrics.set_enabled(True)
+    metrics.reset()
+    yield
+    metrics.set_enabled(was_enabled)
+    metrics.reset()
+
+def test_disabled_metrics_record_nothing(recording):
+    """With instrumentation off, timers, counters and decorated calls are no-ops"""
+    metrics.set_enabled(False)
+    with metrics.timer("block"):
+        metrics.increment("hits")
+    database.get_all_entries()
+    assert metrics.snapshot() == {"timers": {}, "counters": {}, "queries": []}
+
+def test_database_calls_are_timed_and_logged(recording):
+    """Decorated database calls get a timer, a query log entry and a row counter"""
+    database.save_entries([("Good day", "Positive", 0.7, "2024-01-01 09:00:00")] * 3)
+    df = database.get_all_entries()
+    assert len(df) == 3
+
+    snapshot = metrics.snapshot()
+    assert snapshot["timers"]["db.get_all_entries"]["count"] == 1
+    assert snapshot["timers"]["db.save_entries"]["max_ms"] >= 0
+    assert snapshot["counters"]["db.get_all_entries.rows"] == 3
+    newest = snapshot["queries"][0]
+    assert newest["name"] == "db.get_all_entries" and newest["rows"] == 3
+
+def test_tuple_results_and_failures_are_logged(recording):
+    """Row counts come from the DataFrame in tuple results, and failing calls still show up"""
+    database.save_entries([("Good day", "Positive", 0.7, "2024-01-01 09:00:00")] * 3)
+    database.get_entries_page(limit=2)
+    database.get_date_bounds()
+
+    @metrics.instrument("db.broken", log_query=True)
+    def broken():
+        raise RuntimeError("no such table")
+
+    with pytest.raises(RuntimeError):
+        broken()
+
+    queries = {query["name"]: query["rows"] for query in metrics.snapshot()["queries"]}
+    assert queries["db.get_entries_page"] == 2
+    assert queries["db.get_date_bounds"] is None
+    assert "db.broken" in queries and queries["db.broken"] is None
+    snapshot = metrics.snapshot()
+    assert snapshot["timers"]["db.broken"]["count"] == 1
+    assert snapshot["counters"]["db.broken.errors"] == 1
+
+def test_handled_database_failures_are_counted(recording, tmp_path, monkeypatch):
+    """Database calls that catch their own errors still count them"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "missing" / "emotions.db"))
+    assert database.get_all_entries() is None
+    assert database.get_date_bounds() is None
+    assert database.save_entries([("Lost", "Neutral", 0.0, "2024-01-01 09:00:00")]) == 0
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["db.get_all_entries.errors"] == 1
+    assert counters["db.get_date_bounds.errors"] == 1
+    assert counters["db.save_entries.errors"] == 1
+
+def test_prometheus_text_format(recording):
+    """Timers render as summaries, counters as totals and extra values as gauges"""
+    metrics.observe("dashboard.wordcloud", 0.25)
+    metrics.observe("dashboard.wordcloud", 0.75)
+    metrics.increment("sentiment.cache_hits", 4)
+    text = metrics.to_prometheus({"writer.queued": 2})
+
+    assert "# TYPE emotions_dashboard_wordcloud_seconds summary" in text
+    assert "emotions_dashboard_wordcloud_seconds_count 2" in text
+    assert "emotions_dashboard_wordcloud_seconds_sum 1.000000" in text
+    assert "emotions_dashboard_wordcloud_seconds_max 0.750000" in text
+    assert "emotions_sentiment_cache_hits_total 4" in text
+    assert "emotions_writer_queued 2" in text
@@ -0,0 +1,84 @@
+from sentiment import analyze_sentiment, analyze_sentiments, categorize_polarity
+
+TEXTS = [
+    "I am feeling great today!",
+    "I am feeling terrible today.",
+    "Today is just another day.",
+    "What a wonderful, happy afternoon with friends.",
+    "This is the worst day of my life, everything is going wrong",
+]
+
+def test_categorize_polarity():
+    """Thresholds match the classic +/-0.1 cut-offs"""
+    assert categorize_polarity(0.5) == "Positive"
+    assert categorize_polarity(-0.5) == "Negative"
+    assert categorize_polarity(0.1) == "Neutral"
+    assert categorize_polarity(-0.1) == "Neutral"
+
+def test_analyze_sentiments_in_process():
+    """Single-worker batches match per-call results in input order"""
+    expected = [analyze_sentiment(text) for text in TEXTS]
+    assert analyze_sentiments(TEXTS, workers=1) == expected
+
+def test_analyze_sentiments_process_pool():
+    """Multi-worker batches keep input order"""
+    import sentiment
+    
+    expected = [analyze_sentiment(text) for text in TEXTS]
+    # Without a cache every text goes through the worker processes
+    sentiment.configure_cache(enabled=False)
+    try:
+        assert analyze_sentiments(TEXTS, workers=2, chunksize=2) == expected
+        assert analyze_sentiments([], workers=2) == []
+    finally:
+        sentiment.configure_cache()
+
+def test_sentiment_cache_hits(tmp_path):
+    """Repeated and whitespace-variant texts are served from the cache"""
+    import sentiment
+    
+    sentiment.configure_cache(max_items=100, persistent=True, path=str(tmp_path / "cache.db"))
+    try:
+        first = sentiment.analyze_sentiment("I am feeling great today!")
+        again = sentiment.analyze_sentiment("  I am feeling   great today!")
+        assert first == again
+        assert sentiment.get_cache_stats()["memory_hits"] == 1
+        
+        # A fresh process only has the disk tier to go on
+        sentiment._cache.clear()
+        assert sentiment.analyze_sentiments(TEXTS[:1], workers=1) == [first]
+        stats = sentiment.get_cache_stats()
+        assert stats["disk_hits"] == 1 and stats["misses"] == 0
+    finally:
+        sentiment.configure_cache()
+
+def test_lexicon_backend_matches_textblob():
+    """The lexicon backend tracks the TextBlob reference on everyday entries"""
+    from sentiment_tools import compare_backends
+    
+    texts = TEXTS + ["I don't feel good today!", "It was very, very bad!!", "Not a good day (!)", "Quite sad :("]
+    report = compare_backends(texts, reference="textblob", candidate="lexicon")
+    assert report["category_agreement"] == 1.0
+    assert report["max_abs_diff"] < 1e-9
+
+def test_backend_selection():
+    """Backends are chosen by name and cached under their own versions"""
+    import pytest
+    import sentiment
+    
+    assert analyze_sentiment("What a wonderful day", backend="lexicon")[0] == "Positive"
+    assert sentiment.get_analyzer("lexicon").version != sentiment.get_analyzer("textblob").version
+    with pytest.raises(ValueError):
+        sentiment.get_analyzer("vader")
+
+def test_bulk_lexicon_scoring_matches_per_text(monkeypatch):
+    """Bulk re-scoring over random synthetic texts matches analyze_sentiment exactly"""
+    import random
+    import sentiment
+    from sentiment_tools import synthetic_corpus
+    
+    monkeypatch.setattr(sentiment, "_cache", None)
+    seed = random.randrange(2 ** 32)
+    texts = synthetic_corpus(2000, seed=seed) + ["It was very, very bad!!", "Not a good day (!)", "really not good", ""]
+    expected = [analyze_sentiment(text, backend="lexicon") for text in texts]
+    assert analyze_sentiments(texts, workers=2, backend="lexicon") == expected, f"seed {seed}"
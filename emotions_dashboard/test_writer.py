@@ -0,0 +1,78 @@
+import queue
+import threading
+
+import pytest
+
+import database
+import writer
+
+def test_writer_scores_and_saves_entries(temp_db):
+    """Submitted entries are scored, committed and reported through their futures"""
+    background = writer.BackgroundWriter(batch_size=10, backend="lexicon")
+    assert background.alive()
+    futures = [background.submit(f"Day {i} was wonderful", date="2024-01-0%d 09:00:00" % (i + 1)) for i in range(5)]
+    assert background.close(timeout=10)
+    assert not background.alive()
+
+    assert [future.result(timeout=0)[0] for future in futures] == ["Positive"] * 5
+    df = database.get_all_entries()
+    assert len(df) == 5
+    assert sorted(df["date"])[0] == "2024-01-01 09:00:00"
+    assert background.stats()["written"] == 5
+    with pytest.raises(RuntimeError):
+        background.submit("Too late")
+
+def test_writer_applies_back_pressure(temp_db, monkeypatch):
+    """A full queue blocks submitters instead of growing without bound"""
+    started = threading.Event()
+    release = threading.Event()
+    original = writer.analyze_sentiments
+
+    def slow_analyze(texts, **kwargs):
+        started.set()
+        release.wait(10)
+        return original(texts, **kwargs)
+
+    monkeypatch.setattr(writer, "analyze_sentiments", slow_analyze)
+    background = writer.BackgroundWriter(max_queue=1, backend="lexicon")
+    first = background.submit("A good start")
+    assert started.wait(10)
+    # The writer is busy with the first entry; one more fits in the queue
+    second = background.submit("A fine middle")
+    with pytest.raises(queue.Full):
+        background.submit("One too many", timeout=0.05)
+
+    release.set()
+    assert background.flush(timeout=10)
+    assert first.result(timeout=0) and second.result(timeout=0)
+    assert len(database.get_all_entries()) == 2
+    background.close(timeout=10)
+
+def test_entry_submitted_during_close_is_written(temp_db, monkeypatch):
+    """An entry being queued while the writer closes still lands before the stop marker"""
+    entered = threading.Event()
+    release = threading.Event()
+
+    class PausingQueue(queue.Queue):
+        def put(self, item, block=True, timeout=None):
+            if item is not writer._STOP:
+                entered.set()
+                release.wait(10)
+            super().put(item, block, timeout)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(writer.queue, "Queue", PausingQueue)
+        background = writer.BackgroundWriter(backend="lexicon")
+    futures = []
+    submitter = threading.Thread(target=lambda: futures.append(background.submit("Caught in time", date="2024-02-01")))
+    submitter.start()
+    assert entered.wait(10)
+    closer = threading.Thread(target=background.close, args=(10,))
+    closer.start()
+    closer.join(0.2)
+    release.set()
+    submitter.join(10)
+    closer.join(10)
+
+    assert futures[0].result(timeout=5)[0] == "Neutral"
+    assert len(database.get_all_entries()) == 1
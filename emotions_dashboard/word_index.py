@@ -0,0 +1,66 @@
+import re
+from collections import Counter
+
+# Same token pattern the word cloud uses: words of two or more characters
+_TOKEN_RE = re.compile(r"\w[\w']+")
+
+# English stopwords, matching the word cloud's default list
+STOPWORDS = frozenset((
+    "a", "about", "above", "after", "again", "against", "all", "also", "am", "an",
+    "and", "any", "are", "aren't", "as", "at", "be", "because", "been", "before",
+    "being", "below", "between", "both", "but", "by", "can", "can't", "cannot", "com",
+    "could", "couldn't", "did", "didn't", "do", "does", "doesn't", "doing", "don't",
+    "down", "during", "each", "else", "ever", "few", "for", "from", "further", "get",
+    "had", "hadn't", "has", "hasn't", "have", "haven't", "having", "he", "he'd",
+    "he'll", "he's", "hence", "her", "here", "here's", "hers", "herself", "him",
+    "himself", "his", "how", "how's", "however", "http", "i", "i'd", "i'll", "i'm",
+    "i've", "if", "in", "into", "is", "isn't", "it", "it's", "its", "itself", "just",
+    "k", "let's", "like", "me", "more", "most", "mustn't", "my", "myself", "no", "nor",
+    "not", "of", "off", "on", "once", "only", "or", "other", "otherwise", "ought",
+    "our", "ours", "ourselves", "out", "over", "own", "r", "same", "shall", "shan't",
+    "she", "she'd", "she'll", "she's", "should", "shouldn't", "since", "so", "some",
+    "such", "than", "that", "that's", "the", "their", "theirs", "them", "themselves",
+    "then", "there", "there's", "therefore", "these", "they", "they'd", "they'll",
+    "they're", "they've", "this", "those", "through", "to", "too", "under", "until",
+    "up", "very", "was", "wasn't", "we", "we'd", "we'll", "we're", "we've", "were",
+    "weren't", "what", "what's", "when", "when's", "where", "where's", "which", "while",
+    "who", "who's", "whom", "why", "why's", "with", "won't", "would", "wouldn't", "www",
+    "you", "you'd", "you'll", "you're", "you've", "your", "yours", "yourself",
+    "yourselves"
+))
+
+def tokenize(text):
+    """
+    Split text into the lowercase terms shown in the word cloud.
+    
+    Mirrors WordCloud's own processing: possessive 's and numbers are dropped
+    and stopwords are removed.
+    
+    Args:
+        text (str): The text to tokenize
+    
+    Returns:
+        list: Lowercase terms in order of appearance
+    """
+    terms = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if word.endswith("'s"):
+            word = word[:-2]
+        if word and not word.isdigit() and word not in STOPWORDS:
+            terms.append(word)
+    return terms
+
+def count_terms(texts):
+    """
+    Count terms across several texts.
+    
+    Args:
+        texts (iterable of str): The texts to count
+    
+    Returns:
+        collections.Counter: Term frequencies
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(tokenize(text))
+    return counts
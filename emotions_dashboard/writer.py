@@ -0,0 +1,208 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import DEFAULT_USER, format_timestamp, save_entries
+from sentiment import analyze_sentiments
+
+# Queue marker asking the writer thread to exit once everything before it is saved
+_STOP = object()
+
+# Seconds the process-wide writer is given at exit to save what is still queued
+EXIT_TIMEOUT = 10
+
+class BackgroundWriter:
+    """
+    A single writer thread that scores and saves submitted entries, so callers
+    do not wait on sentiment analysis or the SQLite commit.
+
+    Entries waiting in the queue are written together in one transaction. The
+    queue is bounded: when it is full, submit() blocks until the writer catches
+    up (or raises queue.Full after its timeout).
+    """
+
+    def __init__(self, max_queue=1000, batch_size=100, backend=None):
+        self.batch_size = batch_size
+        self.backend = backend
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="emotions-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, date=None, timeout=None, user_id=DEFAULT_USER):
+        """
+        Queue an entry to be scored and saved.
+
+        Args:
+            text (str): The emotion text
+            date: Entry timestamp (see format_timestamp). Defaults to the time of
+                submission, not of the write
+            timeout (float): Seconds to wait for room in a full queue; None waits
+                indefinitely
+            user_id (str): Journal the entry belongs to
+
+        Returns:
+            concurrent.futures.Future: Resolves to (sentiment_category, sentiment_score)
+                once the entry is committed
+
+        Raises:
+            queue.Full: If the queue stayed full for the whole timeout
+            RuntimeError: If the writer has been closed
+        """
+        future = Future()
+        item = (text, format_timestamp(date), user_id, future)
+        # Queue under the lock, so no entry can land behind the stop marker
+        # that close() puts after setting _closed
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The background writer is closed")
+            self._queue.put(item, timeout=timeout)
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            # Take whatever else is already waiting, up to one batch
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Score a batch and save it in one transaction, resolving its futures."""
+        # Entries cancelled while queued are still saved, just not reported
+        running = [future.set_running_or_notify_cancel() for _, _, _, future in batch]
+        try:
+            results = analyze_sentiments([text for text, _, _, _ in batch], workers=1, backend=self.backend)
+            entries = [
+                (text, sentiment, score, date, user_id)
+                for (text, date, user_id, _), (sentiment, score) in zip(batch, results)
+            ]
+            if save_entries(entries, batch_size=len(entries)) != len(entries):
+                raise RuntimeError(f"Could not save a batch of {len(entries)} entries")
+        except Exception as e:
+            print(f"Error writing entries: {e}")
+            self.failed += len(batch)
+            for (_, _, _, future), is_running in zip(batch, running):
+                if is_running:
+                    future.set_exception(e)
+            return
+        
+        self.batches += 1
+        self.written += len(batch)
+        for (_, _, _, future), is_running, result in zip(batch, running, results):
+            if is_running:
+                future.set_result(tuple(result))
+
+    def flush(self, timeout=None):
+        """
+        Wait until every entry submitted so far has been committed.
+
+        Args:
+            timeout (float): Seconds to wait; None waits indefinitely
+
+        Returns:
+            bool: True if the queue drained in time
+        """
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Stop accepting entries, write everything still queued and stop the thread.
+
+        Args:
+            timeout (float): Seconds to wait for the queue to drain
+
+        Returns:
+            bool: True if the writer finished within the timeout
+        """
+        with self._lock:
+            if self._closed:
+                return not self._thread.is_alive()
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def alive(self):
+        """
+        Check whether the writer thread is still running.
+
+        Returns:
+            bool: False once the thread has stopped, after close() or an
+                unexpected error
+        """
+        return self._thread.is_alive()
+
+    def stats(self):
+        """
+        Report writer activity.
+
+        Returns:
+            dict: Queued entries, committed batches and entries, and failed entries
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+# Process-wide writer, created on first use
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """
+    Get the process-wide background writer, starting it on first use.
+
+    Returns:
+        BackgroundWriter: The shared writer
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter()
+        return _writer
+
+def close_writer(timeout=None):
+    """Write any queued entries and stop the process-wide writer."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
+
+# Registered after database's close_connections, so queued entries are
+# written before the connections are closed. The timeout keeps a stuck write
+# from hanging interpreter shutdown
+atexit.register(close_writer, EXIT_TIMEOUT)